@@ -0,0 +1,93 @@
+import re
+from typing import Any, Dict, List
+
+from bs4 import BeautifulSoup, SoupStrainer
+
+# atpump.ru page extraction. Functions are top-level and pure so they can run
+# in a process pool; lxml is used when installed.
+try:
+    import lxml  # noqa: F401
+    HTML_PARSER = "lxml"
+except ImportError:
+    HTML_PARSER = "html.parser"
+
+ARTICLE_RE = re.compile(r"Артикул[:\s]*([A-Z0-9\-]+)")
+TECH_DESCRIPTION_RE = re.compile("Скачать техническое описание")
+
+
+def class_token(*names: str) -> "re.Pattern":
+    """Match a class attribute containing any of `names` as a whole token."""
+    return re.compile(r"(^|\s)(" + "|".join(map(re.escape, names)) + r")(\s|$)")
+
+
+# Fragments kept from each page. The strainer sees the whole class attribute,
+# so elements are matched by class token to keep multi-class tags
+SEARCH_ONLY = SoupStrainer(class_=class_token("product-list__item"))
+PRODUCT_ONLY = SoupStrainer(class_=class_token(
+    "content-head__title",
+    "price",
+    "product-card__description",
+    "product_features",
+    "js-product-image-popup",
+))
+
+
+def parse_search(html: str, article: str) -> List[str]:
+    """Return product page paths of search results whose article equals `article`."""
+    soup = BeautifulSoup(html, HTML_PARSER, parse_only=SEARCH_ONLY)
+    links = []
+    for item in soup.select(".product-list__item"):
+        code_div = item.select_one(".product-code")
+        if not code_div:
+            continue
+        match = ARTICLE_RE.search(code_div.get_text())
+        site_article = match.group(1).strip() if match else None
+        if site_article and article == site_article:
+            link_tag = item.select_one("a.product-list__name")
+            if link_tag and link_tag.has_attr("href"):
+                links.append(link_tag["href"])
+    return links
+
+
+def parse_product(html: str, site_url: str) -> Dict[str, Any]:
+    """Extract name, price, description, images and attributes from a product page."""
+    soup = BeautifulSoup(html, HTML_PARSER, parse_only=PRODUCT_ONLY)
+    title_tag = soup.find("div", class_="content-head__title").find("h1")
+    title = title_tag.text.strip() if title_tag else ""
+
+    price_tag = soup.find("div", class_="price")
+    if price_tag is None:
+        # Never build a card priced 0; the caller skips the article
+        raise ValueError("на странице товара не найдена цена")
+    price = price_tag["data-price"].strip() if price_tag.has_attr("data-price") else price_tag.text.strip()
+
+    description_tag = soup.find("div", class_="product-card__description")
+    description = [s.replace('\n', ' ') for s in description_tag.stripped_strings] if description_tag else []
+
+    tech_description_tag = description_tag.find("a", href=True, string=TECH_DESCRIPTION_RE) if description_tag else None
+    if tech_description_tag:
+        description.append(f"Ссылка на тех. описание: {tech_description_tag['href']}")
+
+    features_table = soup.find("table", class_="product_features")
+    attributes = []
+    if features_table:
+        for row in features_table.find_all("tr", class_="product_features-item"):
+            feature_name = row.find("td", class_="product_features-title")
+            feature_value = row.find("td", class_="product_features-value")
+            if feature_name and feature_value:
+                attributes.append({"id": feature_name.text.strip(), "value": feature_value.text.strip()})
+
+    images = []
+    for img in soup.find_all("a", class_="js-product-image-popup", href=True):
+        img_url = img["href"]
+        if img_url and img_url.startswith("/"):
+            img_url = site_url + img_url
+        images.append(img_url)
+
+    return {
+        "name": title,
+        "price": int(price.replace(" ", "")),
+        "description": description,
+        "images": images,
+        "attributes": attributes,
+    }
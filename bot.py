@@ -1,21 +1,32 @@
+import io
 import os
 import asyncio
 import logging
 from dotenv import load_dotenv
-from typing import Any, Dict, Set, Tuple, AsyncGenerator
+from itertools import zip_longest
+from typing import Any, Dict, Iterator, List, Optional, Set, Tuple, AsyncGenerator
 
+import numpy as np
 import pandas as pd
-import ssl
 
-import aiohttp
-from aiohttp import ClientResponseError, TCPConnector, ClientTimeout
+from aiohttp import ClientResponseError
 
 from aiogram import Bot, Dispatcher, types, F
 from aiogram.filters import Command
 from aiogram.fsm.storage.memory import MemoryStorage
 from aiogram.fsm.context import FSMContext
 from aiogram.fsm.state import State, StatesGroup
-from aiogram.types import ReplyKeyboardMarkup, KeyboardButton
+from aiogram.types import BufferedInputFile, ReplyKeyboardMarkup, KeyboardButton
+
+from catalog_cache import CatalogCache
+from jobs import JobRunner
+from progress import LogProgress, Progress, TelegramProgress
+from single_flight import SingleFlight
+from supplier_file import read_supplier_csv, read_supplier_excel
+from upload_store import UploadStore, spooled_buffer
+from ozon_client import OzonClient
+from snapshot_store import PushSnapshot
+from ozon_dispatch import ENDPOINT_BATCH_SIZES, ENDPOINT_FIELDS, dispatch_batches, default_rate_limits
 
 # Load configuration from .env
 load_dotenv()
@@ -52,25 +63,66 @@ keyboard = ReplyKeyboardMarkup(
             KeyboardButton(text="Ввести курс евро к рублю"),
             KeyboardButton(text="Добавить файл с товарами"),
             KeyboardButton(text="Обновить товары")
+        ],
+        [
+            KeyboardButton(text="Полное обновление"),
+            KeyboardButton(text="Статус обновления"),
+            KeyboardButton(text="Отменить обновление")
         ]
     ],
     resize_keyboard=True
 )
 
+# Background update jobs, one active per user
+job_runner = JobRunner()
+
+JOB_STATUS_LABELS = {
+    "queued": "в очереди",
+    "running": "выполняется",
+    "done": "завершено",
+    "failed": "завершилось с ошибкой",
+    "cancelled": "отменено",
+}
+
 # In-memory user data
 user_data: Dict[int, Dict[str, Any]] = {}
 
-# Ozon API headers
-OZON_HEADERS = {
-    "Client-Id": OZON_CLIENT_ID,
-    "Api-Key": OZON_API_KEY,
-    "Content-Type": "application/json"
-}
+# Catalog syncs shared between users pressing "update" close together
+CATALOG_SHARE_TTL = float(os.getenv("CATALOG_SHARE_TTL", "60"))
+catalog_flight = SingleFlight(CATALOG_SHARE_TTL)
+
+# Raw uploads, deduplicated by content
+upload_store = UploadStore()
+
+# Local catalog cache (offer_id -> is_kgt and other metadata)
+catalog_cache = CatalogCache()
+
+# Last successfully pushed prices/stocks for this Ozon account
+push_snapshot = PushSnapshot(OZON_CLIENT_ID)
+
+# Per-endpoint rate limits shared by all update runs
+rate_limits = default_rate_limits()
+
+# Warehouses: oversized (KGT) goods go to a dedicated one
+WAREHOUSE_KGT = 1020002531538000
+WAREHOUSE_DEFAULT = 1020002390459000
+
+# Process-wide Ozon API client (one keep-alive connection pool)
+ozon = OzonClient(OZON_CLIENT_ID, OZON_API_KEY)
+
+@dp.startup()
+async def on_startup():
+    await ozon.start()
+
+@dp.shutdown()
+async def on_shutdown():
+    await job_runner.shutdown()
+    await ozon.close()
 
 @dp.message(Command("start"))
 async def cmd_start(message: types.Message):
     user_id = message.from_user.id
-    user_data[user_id] = {"exchange_rate": None, "file_path": None}
+    user_data[user_id] = {"exchange_rate": None, "products": None}
     await message.answer(
         "Привет! Введите курс евро к рублю и загрузите файл с товарами, чтобы обновить их на Ozon.",
         reply_markup=keyboard
@@ -119,209 +171,382 @@ async def process_file(message: types.Message, state: FSMContext):
         )
         return
 
-    save_dir = "user_files"
-    os.makedirs(save_dir, exist_ok=True)
-    path = os.path.join(save_dir, f"{user_id}_{doc.file_name}")
-
-    # Download the file
+    # Download the file into memory (spills to a temp file when large)
     file = await bot.get_file(doc.file_id)
-    await bot.download_file(file.file_path, destination=path)
-
-    # Process Excel
-    if fname.endswith(('.xlsx', '.xls')):
-        try:
-            df = pd.read_excel(path, header=3)
-            df_filtered = df[['Группа', 'Цена', 'СКЛАД']].copy()
-        except Exception as e:
-            await message.answer(f"Ошибка обработки Excel: {e}")
-            await state.clear()
-            return
-        df_filtered.columns = ['Артикул', 'Цена', 'Кол-во']
-        df_filtered.dropna(subset=['Артикул', 'Цена'], inplace=True)
-        df_filtered.loc[:, 'Цена'] = pd.to_numeric(df_filtered['Цена'], errors='coerce')
-        df_filtered.loc[:, 'Кол-во'] = pd.to_numeric(df_filtered['Кол-во'], errors='coerce').fillna(0).astype(int)
-        output_path = f'updated_products_{user_id}.xlsx'
-        df_filtered.to_excel(output_path, index=False)
-        user_data[user_id]['file_path'] = output_path
-    else:
-        # Process CSV
-        try:
-            df = pd.read_csv(path, sep=None, engine='python')
-        except UnicodeDecodeError:
-            df = pd.read_csv(path, sep=None, engine='python', encoding='cp1251')
-        try:
-            df = df[['Группа', 'Цена', 'СКЛАД']].dropna(subset=['Группа', 'Цена'])
-        except KeyError:
-            await message.answer("В CSV отсутствуют столбцы 'Группа', 'Цена' или 'СКЛАД'.")
-            await state.clear()
-            return
-        df.rename(columns={'Группа': 'Артикул', 'СКЛАД': 'Кол-во'}, inplace=True)
-        df.loc[:, 'Цена'] = pd.to_numeric(df['Цена'], errors='coerce')
-        df.loc[:, 'Кол-во'] = pd.to_numeric(df['Кол-во'], errors='coerce').fillna(0).astype(int)
-        output_path = f'updated_products_{user_id}.xlsx'
-        df.to_excel(output_path, index=False)
-        user_data[user_id]['file_path'] = output_path
-
+    buf = spooled_buffer()
+    try:
+        await bot.download_file(file.file_path, destination=buf)
+        upload_store.put(buf, os.path.splitext(fname)[1])
+
+        # Process Excel
+        if fname.endswith(('.xlsx', '.xls')):
+            try:
+                df_filtered = read_supplier_excel(buf, xls=fname.endswith('.xls'))
+            except Exception as e:
+                await message.answer(f"Ошибка обработки Excel: {e}")
+                await state.clear()
+                return
+            df_filtered.columns = ['Артикул', 'Цена', 'Кол-во']
+            df_filtered.dropna(subset=['Артикул', 'Цена'], inplace=True)
+            df_filtered.loc[:, 'Цена'] = pd.to_numeric(df_filtered['Цена'], errors='coerce')
+            df_filtered.loc[:, 'Кол-во'] = pd.to_numeric(df_filtered['Кол-во'], errors='coerce').fillna(0).astype(int)
+            df = df_filtered
+        else:
+            # Process CSV
+            try:
+                df = read_supplier_csv(buf, required=['Группа', 'Цена'])
+            except KeyError:
+                await message.answer("В CSV отсутствуют столбцы 'Группа', 'Цена' или 'СКЛАД'.")
+                await state.clear()
+                return
+            except Exception as e:
+                await message.answer(f"Ошибка обработки CSV: {e}")
+                await state.clear()
+                return
+            df.rename(columns={'Группа': 'Артикул', 'СКЛАД': 'Кол-во'}, inplace=True)
+            df.loc[:, 'Цена'] = pd.to_numeric(df['Цена'], errors='coerce')
+            df.loc[:, 'Кол-во'] = pd.to_numeric(df['Кол-во'], errors='coerce').fillna(0).astype(int)
+    finally:
+        buf.close()
+
+    # Keep the normalized table in memory; xlsx is only built on /export
+    user_data.setdefault(user_id, {})['products'] = df.reset_index(drop=True)
     await state.clear()
     await message.answer(
         "Файл успешно загружен и обработан.",
         reply_markup=keyboard
     )
 
+@dp.message(Command("export"))
+async def cmd_export(message: types.Message):
+    df = user_data.get(message.from_user.id, {}).get("products")
+    if df is None:
+        await message.answer("Сначала загрузите файл с товарами!")
+        return
+    buf = io.BytesIO()
+    df.to_excel(buf, index=False)
+    await message.answer_document(
+        BufferedInputFile(buf.getvalue(), filename="updated_products.xlsx")
+    )
+
 @dp.message(lambda m: m.text == "Обновить товары")
 async def cmd_update_products(message: types.Message):
+    await start_update(message, force=False)
+
+@dp.message(Command("full_update"))
+@dp.message(lambda m: m.text == "Полное обновление")
+async def cmd_full_update(message: types.Message):
+    await start_update(message, force=True)
+
+@dp.message(Command("status"))
+@dp.message(lambda m: m.text == "Статус обновления")
+async def cmd_status(message: types.Message):
+    job = job_runner.get(message.from_user.id)
+    if job is None:
+        await message.answer("Обновлений ещё не запускалось.")
+        return
+    text = f"{job.description}: {JOB_STATUS_LABELS[job.status]} ({int(job.elapsed)} с)"
+    if job.progress is not None:
+        text += "\n" + job.progress.format()
+    await message.answer(text)
+
+@dp.message(Command("cancel"))
+@dp.message(lambda m: m.text == "Отменить обновление")
+async def cmd_cancel(message: types.Message):
+    if job_runner.cancel(message.from_user.id):
+        await message.answer("Отменяю обновление...")
+    else:
+        await message.answer("Нет активного обновления.")
+
+async def start_update(message: types.Message, force: bool):
+    """Validate the user's input and submit the update as a background job."""
     user_id = message.from_user.id
     data = user_data.get(user_id, {})
     rate = data.get("exchange_rate")
-    path = data.get("file_path")
+    df = data.get("products")
 
     if not rate:
         await message.answer("Сначала введите курс евро к рублю!")
         return
-    if not path or not os.path.exists(path):
+    if df is None:
         await message.answer("Сначала загрузите файл с товарами!")
         return
 
-    try:
-        df = pd.read_excel(path)
-    except Exception as e:
-        await message.answer(f"Не удалось прочитать файл: {e}")
+    description = "Полное обновление" if force else "Обновление"
+    progress = Progress()
+    progress.subscribe(LogProgress(f"user {user_id}"))
+    job = job_runner.submit(user_id, lambda: run_update(message, rate, df, force, progress), description)
+    if job is None:
+        await message.answer("Обновление уже выполняется. Статус: /status, отмена: /cancel")
         return
+    job.progress = progress
+    await message.answer("Обновление запущено в фоне. Статус: /status, отмена: /cancel")
+
+async def run_update(
+    message: types.Message,
+    rate: float,
+    df: pd.DataFrame,
+    force: bool,
+    progress: Progress
+):
+    """Background job body: run the push and tell the user if it was cancelled."""
+    try:
+        await push_updates(message, rate, df, force, progress)
+    except asyncio.CancelledError:
+        await message.answer("Обновление отменено.", reply_markup=keyboard)
+        raise
+
+async def push_updates(
+    message: types.Message,
+    rate: float,
+    df: pd.DataFrame,
+    force: bool,
+    progress: Progress
+):
+    """
+    Push prices and stocks for the user's file. Unless `force` is set, only rows
+    that differ from the last successfully pushed snapshot are sent.
+    Progress is shown by editing a single status message.
+    """
+    status_message = await message.answer(progress.format())
+    telegram_progress = TelegramProgress(status_message)
+    progress.subscribe(telegram_progress)
 
-    ssl_ctx = ssl.create_default_context()
-    ssl_ctx.check_hostname = False
-    ssl_ctx.verify_mode = ssl.CERT_NONE
-    connector = TCPConnector(ssl=ssl_ctx, limit=20)
-    timeout = ClientTimeout(total=60)
-
-    async with aiohttp.ClientSession(
-        headers=OZON_HEADERS,
-        connector=connector,
-        timeout=timeout
-    ) as session:
+    # The status message is finalized on every exit path
+    try:
+        # Only the file's articles need product info
+        articles = set(df["Артикул"].dropna().astype(str).str.strip()) if "Артикул" in df.columns else set()
+        # Errors are reported to the user and re-raised so the job is marked failed
         try:
-            offer_ids = await fetch_all_offer_ids(session)
-            kgt_ids = await fetch_kgt_set(session, offer_ids)
+            offer_ids, kgt_ids = await load_catalog(ozon, catalog_cache, articles)
         except ValueError as e:
             await message.answer(str(e))
-            return
+            raise
         except ClientResponseError as e:
             logging.error(f"HTTP error: {e.status} {e.message}")
             await message.answer(f"Ошибка при обращении к Ozon: {e.status}. Попробуйте позже.")
-            return
+            raise
         except Exception:
-            logging.exception("Unexpected error при получении данных от Ozon")
             await message.answer("Не удалось получить данные от Ozon.")
-            return
+            raise
 
-        updated = 0
-        async for price_batch, stock_batch in generate_batches(df, rate, offer_ids, kgt_ids):
-            if await send_update_batch(session, price_batch, stock_batch):
-                updated += len(price_batch.get("prices", []))
+        progress.catalog_fetched(len(offer_ids))
+
+        updated = {"prices": 0, "stocks": 0}
+        failed = 0
+        jobs = update_jobs(df, rate, offer_ids, kgt_ids, None if force else push_snapshot, progress)
+        async for result in dispatch_batches(ozon.session, jobs, rate_limits):
+            if result.updated:
+                updated[result.endpoint] += len(result.updated)
+                push_snapshot.record(result.endpoint, result.updated)
+            failed += len(result.failed)
+            retried = len(result.records) - len(result.updated) - len(result.failed)
+            progress.batch_done(len(result.updated), len(result.failed), retried)
+
+        progress.finish()
+    except asyncio.CancelledError:
+        progress.cancel()
+        raise
+    except Exception:
+        progress.fail()
+        raise
+    finally:
+        try:
+            await telegram_progress.flush(progress)
+        except Exception as e:
+            logging.warning(f"Final progress update failed: {e!r}")
 
     await message.answer(
-        f"Обновление завершено! Успешно обновлено {updated} позиций по курсу {rate}.",
+        f"Обновление завершено! Успешно обновлено {updated['prices']} позиций по курсу {rate} "
+        f"(остатки: {updated['stocks']}, ошибок: {failed}).",
         reply_markup=keyboard
     )
 
 # Helper functions
+async def fetch_product_list(
+    client: OzonClient
+) -> Dict[str, Dict[str, Any]]:
+    """
+    Page through product/list and return offer_id -> list item.
+    Raises ValueError on bad request.
+    """
+    items: Dict[str, Dict[str, Any]] = {}
+    async for page in client.iter_product_pages():
+        for item in page:
+            items[item.get("offer_id")] = item
+    return items
+
 async def fetch_all_offer_ids(
-    session: aiohttp.ClientSession
+    client: OzonClient
 ) -> Set[str]:
-    url = "https://api-seller.ozon.ru/v3/product/list"
-    items: list = []
-    last_id: str = ""
-    while True:
-        payload = {"filter": {"visibility": "ALL"}, "last_id": last_id, "limit": 1000}
-        async with session.post(url, headers=OZON_HEADERS, json=payload) as resp:
-            text = await resp.text()
-            if resp.status == 400:
-                raise ValueError(f"Ошибка запроса к Ozon (product/list): {text}")
-            resp.raise_for_status()
-            data = await resp.json()
-        result = data.get("result", {})
-        batch = result.get("items", [])
-        if not batch:
-            break
-        items.extend(batch)
-        last_id = result.get("last_id", "") or ""
-        if not last_id:
-            break
-    return {item.get("offer_id") for item in items}
+    return set(await fetch_product_list(client))
+
+async def fetch_product_info(
+    client: OzonClient,
+    offer_ids: Set[str]
+) -> List[Dict[str, Any]]:
+    """
+    Fetch detailed info for given offer_ids in batches of 1000.
+    Raises ValueError on bad request.
+    """
+    products: List[Dict[str, Any]] = []
+    try:
+        async for batch in client.iter_product_info(offer_ids):
+            products.extend(batch)
+    except ClientResponseError as e:
+        logging.error(f"HTTP error fetching product info: {e.status}")
+        raise
+    return products
 
 async def fetch_kgt_set(
-    session: aiohttp.ClientSession,
+    client: OzonClient,
     offer_ids: Set[str]
 ) -> Set[str]:
     """
     Fetch detailed info for given offer_ids in batches and return set of KGT offer_ids.
     Raises ValueError on bad request.
     """
-    url = "https://api-seller.ozon.ru/v3/product/info/list"
-    kgt_ids: Set[str] = set()
-    # Split offer_ids into chunks of max 1000
-    ids_list = list(offer_ids)
-    for i in range(0, len(ids_list), 1000):
-        batch_ids = ids_list[i:i + 1000]
-        payload = {"offer_id": batch_ids}
-        try:
-            async with session.post(url, headers=OZON_HEADERS, json=payload) as resp:
-                text = await resp.text()
-                if resp.status == 400:
-                    raise ValueError(f"Ошибка запроса к Ozon (product/info): {text}")
-                resp.raise_for_status()
-                data = await resp.json()
-        except ClientResponseError as e:
-            logging.error(f"HTTP error fetching product info: {e.status}")
-            raise
-        items = data.get("items", []) or []
-        for item in items:
-            if item.get("is_kgt"):
-                kgt_ids.add(item.get("offer_id"))
-    return kgt_ids
+    products = await fetch_product_info(client, offer_ids)
+    return {item.get("offer_id") for item in products if item.get("is_kgt")}
+
+async def load_catalog(
+    client: OzonClient,
+    cache: CatalogCache,
+    wanted: Optional[Set[str]] = None
+) -> Tuple[Set[str], Set[str]]:
+    """
+    Return (offer_ids, kgt_ids) using the local catalog cache.
+    Concurrent callers share one catalog sync (and its result for
+    CATALOG_SHARE_TTL seconds); a caller that joined someone else's sync only
+    tops up product info for its own new or changed articles.
+    """
+    list_items = await catalog_flight.do(
+        OZON_CLIENT_ID, lambda: sync_catalog(client, cache, wanted)
+    )
+    if wanted is not None:
+        own = {offer_id: list_items[offer_id] for offer_id in wanted if offer_id in list_items}
+        missing = cache.stale_offer_ids(own)
+        if missing:
+            info: List[Dict[str, Any]] = []
+            async for batch in client.iter_product_info(missing):
+                info.extend(batch)
+            cache.upsert(list_items, info)
+    return set(list_items), cache.kgt_ids()
+
+async def sync_catalog(
+    client: OzonClient,
+    cache: CatalogCache,
+    wanted: Optional[Set[str]] = None
+) -> Dict[str, Dict[str, Any]]:
+    """
+    Traverse product/list and refresh the catalog cache; returns offer_id -> list item.
+    Product info is downloaded only for new or changed products, overlapping
+    with the product/list traversal; the cache is rebuilt from scratch once its
+    TTL has expired. With `wanted`, info is requested only for those offer_ids,
+    so the cost follows the size of the uploaded file, not of the catalog.
+    """
+    list_items: Dict[str, Dict[str, Any]] = {}
+    rebuild = cache.is_expired()
+    cached = {} if rebuild else cache.list_state()
+
+    async def listed_pages():
+        async for page in client.iter_product_pages():
+            for item in page:
+                list_items[item.get("offer_id")] = item
+            yield page
+
+    def select(page: List[Dict[str, Any]]) -> Set[str]:
+        stale = cache.stale_offer_ids({item.get("offer_id"): item for item in page}, cached)
+        return stale & wanted if wanted is not None else stale
+
+    info: List[Dict[str, Any]] = []
+    async for batch in client.iter_info_for_pages(listed_pages(), select):
+        info.extend(batch)
+    logging.info(f"Catalog: {len(list_items)} listed, info fetched for {len(info)}")
+
+    if rebuild:
+        logging.info("Catalog cache expired, rebuilt")
+        cache.clear()
+        cache.upsert(list_items, info)
+        cache.mark_rebuilt()
+    else:
+        cache.upsert(list_items, info)
+        gone = cache.offer_ids() - set(list_items)
+        if gone:
+            cache.remove(gone)
+    return list_items
 
-async def generate_batches(
+def build_update_frame(
+    df: pd.DataFrame,
+    rate: float,
+    valid_ids: Set[str],
+    kgt_ids: Set[str]
+) -> pd.DataFrame:
+    """
+    Filter, price and assign warehouses for the whole table in one columnar pass.
+    Returns columns offer_id, price, old_price, stock, warehouse_id.
+    """
+    if "Артикул" not in df.columns:
+        return pd.DataFrame(columns=["offer_id", "price", "old_price", "stock", "warehouse_id"])
+    arts = df["Артикул"].astype(str).str.strip()
+    price = pd.to_numeric(df["Цена"], errors="coerce")
+    known = arts.isin(valid_ids)
+    # Never send a made-up price: rows whose price can't be parsed are skipped
+    no_price = known & price.isna()
+    if no_price.any():
+        logging.warning(f"Skipped {int(no_price.sum())} rows without a valid price")
+    mask = known & price.notna()
+    offer_ids = arts[mask]
+    price_rub = (price[mask] * rate).astype("int64")
+    if "Кол-во" in df.columns:
+        stock = pd.to_numeric(df.loc[mask, "Кол-во"], errors="coerce").fillna(0).astype("int64")
+    else:
+        stock = pd.Series(0, index=offer_ids.index, dtype="int64")
+    return pd.DataFrame({
+        "offer_id": offer_ids,
+        "price": price_rub.astype(str),
+        "old_price": (price_rub * 1.2).astype("int64").astype(str),
+        "stock": stock,
+        "warehouse_id": np.where(offer_ids.isin(kgt_ids), WAREHOUSE_KGT, WAREHOUSE_DEFAULT),
+    }).reset_index(drop=True)
+
+def generate_batches(
+    frame: pd.DataFrame,
+    endpoint: str,
+    batch_size: int
+) -> Iterator[Dict[str, Any]]:
+    """Slice one endpoint's columns of the update frame into payload chunks."""
+    # to_dict converts numpy scalars to plain Python types for JSON
+    records = frame[ENDPOINT_FIELDS[endpoint]].to_dict("records")
+    for i in range(0, len(records), batch_size):
+        yield {endpoint: records[i:i + batch_size]}
+
+async def update_jobs(
     df: pd.DataFrame,
     rate: float,
     valid_ids: Set[str],
     kgt_ids: Set[str],
-    batch_size: int = 100
-) -> AsyncGenerator[Tuple[Dict[str, Any], Dict[str, Any]], None]:
-    prices, stocks = [], []
-    for _, row in df.iterrows():
-        art = str(row.get("Артикул", "")).strip()
-        if art not in valid_ids:
-            continue
-        price_rub = int(row.get("Цена", 0) * rate)
-        warehouse = 1020002531538000 if art in kgt_ids else 1020002390459000
-        prices.append({"offer_id": art, "price": str(price_rub), "old_price": str(int(price_rub * 1.2))})
-        stocks.append({"offer_id": art, "stock": row.get("Кол-во", 0), "warehouse_id": warehouse})
-        if len(prices) >= batch_size:
-            yield {"prices": prices}, {"stocks": stocks}
-            prices, stocks = [], []
-    if prices:
-        yield {"prices": prices}, {"stocks": stocks}
-
-async def send_update_batch(
-    session: aiohttp.ClientSession,
-    price_payload: Dict[str, Any],
-    stock_payload: Dict[str, Any]
-) -> bool:
-    try:
-        price_url = "https://api-seller.ozon.ru/v1/product/import/prices"
-        stock_url = "https://api-seller.ozon.ru/v2/products/stocks"
-        price_resp, stock_resp = await asyncio.gather(
-            session.post(price_url, headers=OZON_HEADERS, json=price_payload),
-            session.post(stock_url, headers=OZON_HEADERS, json=stock_payload)
-        )
-        price_resp.raise_for_status()
-        stock_resp.raise_for_status()
-        return True
-    except ClientResponseError as e:
-        logging.error(f"Ozon API error: {e.status} - {e.message}")
-    except Exception:
-        logging.exception("Unexpected error in send_update_batch")
-    return False
+    snapshot: Optional[PushSnapshot] = None,
+    progress: Optional[Progress] = None
+) -> AsyncGenerator[Tuple[str, Dict[str, Any]], None]:
+    """
+    Interleave the independent price and stock streams into (endpoint, payload)
+    jobs for the dispatcher, each chunked to its endpoint's maximum size.
+    With a snapshot, each stream keeps only rows changed since the last push.
+    """
+    frame = build_update_frame(df, rate, valid_ids, kgt_ids)
+    streams = []
+    for endpoint in ("prices", "stocks"):
+        rows = snapshot.changed_rows(frame, endpoint) if snapshot else frame
+        logging.info(f"{endpoint}: {len(rows)} of {len(frame)} rows to push")
+        if progress is not None:
+            progress.planned(len(rows))
+        streams.append(generate_batches(rows, endpoint, ENDPOINT_BATCH_SIZES[endpoint]))
+    for price_batch, stock_batch in zip_longest(*streams):
+        if price_batch is not None:
+            yield "prices", price_batch
+        if stock_batch is not None:
+            yield "stocks", stock_batch
 
 if __name__ == "__main__":
     dp.run_polling(bot, skip_updates=True)
@@ -0,0 +1,132 @@
+import os
+import time
+import sqlite3
+from typing import Any, Dict, Iterable, Optional, Set
+
+# Catalog cache settings
+CATALOG_CACHE_PATH = os.getenv("CATALOG_CACHE_PATH", "catalog_cache.sqlite3")
+CATALOG_CACHE_TTL = int(os.getenv("CATALOG_CACHE_TTL", "86400"))
+
+
+class CatalogCache:
+    """
+    Local SQLite store of the Ozon catalog: offer_id -> product metadata.
+    The whole table is rebuilt once the TTL runs out; in between only new or
+    changed products are refreshed.
+    """
+
+    def __init__(self, path: str = CATALOG_CACHE_PATH, ttl: int = CATALOG_CACHE_TTL):
+        self.path = path
+        self.ttl = ttl
+        self.conn = sqlite3.connect(path)
+        self.conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS products (
+                offer_id   TEXT PRIMARY KEY,
+                product_id INTEGER,
+                archived   INTEGER NOT NULL DEFAULT 0,
+                is_kgt     INTEGER NOT NULL DEFAULT 0,
+                name       TEXT,
+                type_id    INTEGER,
+                fetched_at REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS meta (
+                key   TEXT PRIMARY KEY,
+                value TEXT
+            );
+            """
+        )
+        self.conn.commit()
+
+    def close(self) -> None:
+        self.conn.close()
+
+    # Freshness
+    def last_rebuild(self) -> float:
+        row = self.conn.execute(
+            "SELECT value FROM meta WHERE key = 'last_rebuild'"
+        ).fetchone()
+        return float(row[0]) if row else 0.0
+
+    def is_expired(self) -> bool:
+        return time.time() - self.last_rebuild() > self.ttl
+
+    def mark_rebuilt(self) -> None:
+        self.conn.execute(
+            "INSERT OR REPLACE INTO meta (key, value) VALUES ('last_rebuild', ?)",
+            (str(time.time()),)
+        )
+        self.conn.commit()
+
+    # Reads
+    def list_state(self) -> Dict[str, tuple]:
+        """Return offer_id -> (product_id, archived) as last seen in product/list."""
+        rows = self.conn.execute("SELECT offer_id, product_id, archived FROM products")
+        return {offer_id: (product_id, bool(archived)) for offer_id, product_id, archived in rows}
+
+    def offer_ids(self) -> Set[str]:
+        return {row[0] for row in self.conn.execute("SELECT offer_id FROM products")}
+
+    def kgt_ids(self) -> Set[str]:
+        return {
+            row[0] for row in self.conn.execute("SELECT offer_id FROM products WHERE is_kgt = 1")
+        }
+
+    # Writes
+    def upsert(self, list_items: Dict[str, Dict[str, Any]], info_items: Iterable[Dict[str, Any]]) -> None:
+        """
+        Store product/info results, merged with the matching product/list entries.
+        """
+        now = time.time()
+        rows = []
+        for info in info_items:
+            offer_id = info.get("offer_id")
+            if not offer_id:
+                continue
+            listed = list_items.get(offer_id, {})
+            rows.append((
+                offer_id,
+                listed.get("product_id", info.get("id")),
+                int(bool(listed.get("archived", False))),
+                int(bool(info.get("is_kgt"))),
+                info.get("name"),
+                info.get("type_id"),
+                now,
+            ))
+        self.conn.executemany(
+            "INSERT OR REPLACE INTO products "
+            "(offer_id, product_id, archived, is_kgt, name, type_id, fetched_at) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+            rows
+        )
+        self.conn.commit()
+
+    def remove(self, offer_ids: Iterable[str]) -> None:
+        self.conn.executemany(
+            "DELETE FROM products WHERE offer_id = ?",
+            [(offer_id,) for offer_id in offer_ids]
+        )
+        self.conn.commit()
+
+    def clear(self) -> None:
+        self.conn.execute("DELETE FROM products")
+        self.conn.commit()
+
+    def stale_offer_ids(
+        self,
+        list_items: Dict[str, Dict[str, Any]],
+        cached: Optional[Dict[str, tuple]] = None
+    ) -> Set[str]:
+        """
+        Compare product/list entries with the cache and return offer_ids that
+        are new or whose product_id/archived state changed. Pass `cached` (from
+        list_state) to avoid re-reading the table for every page.
+        """
+        if cached is None:
+            cached = self.list_state()
+        stale = set()
+        for offer_id, item in list_items.items():
+            state = (item.get("product_id"), bool(item.get("archived", False)))
+            if cached.get(offer_id) != state:
+                stale.add(offer_id)
+        return stale
@@ -0,0 +1,135 @@
+import os
+import json
+import time
+import sqlite3
+from typing import Any, Dict, Iterable, NamedTuple, Optional, Set
+
+# Checkpoints of an unfinished parser.py run
+CRAWL_STATE_PATH = os.getenv("CRAWL_STATE_PATH", "crawl_state.sqlite3")
+
+# Article statuses, in pipeline order
+SCRAPED = "scraped"
+FORMATTED = "formatted"
+UPLOADED = "uploaded"
+FAILED = "failed"
+UNCHANGED = "unchanged"
+FINISHED_STATUSES = {UPLOADED, FAILED, UNCHANGED}
+
+
+class ArticleState(NamedTuple):
+    status: str
+    category_id: Any
+    scraped: Optional[Dict[str, Any]]
+    formatted: Optional[Dict[str, Any]]
+
+
+class CrawlState:
+    """
+    Durable per-article progress of one parser.py run: the status reached and
+    the scraped and formatted payloads. A restarted run resumes from here
+    instead of re-fetching the Ozon catalog and re-scraping every article;
+    `reset` clears it once a run completes.
+    """
+
+    def __init__(self, path: str = CRAWL_STATE_PATH):
+        self.conn = sqlite3.connect(path)
+        self.conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS articles (
+                article     TEXT PRIMARY KEY,
+                category_id TEXT,
+                status      TEXT NOT NULL,
+                scraped     TEXT,
+                formatted   TEXT,
+                error       TEXT,
+                updated_at  REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS ozon_offers (
+                offer_id TEXT PRIMARY KEY
+            );
+            CREATE TABLE IF NOT EXISTS meta (
+                key   TEXT PRIMARY KEY,
+                value TEXT
+            );
+            """
+        )
+        self.conn.commit()
+
+    def close(self) -> None:
+        self.conn.close()
+
+    def reset(self) -> None:
+        self.conn.executescript("DELETE FROM articles; DELETE FROM ozon_offers; DELETE FROM meta;")
+        self.conn.commit()
+
+    # Ozon catalog snapshot taken at the start of the run
+    def ozon_offer_ids(self) -> Optional[Set[str]]:
+        if self.conn.execute("SELECT 1 FROM meta WHERE key = 'ozon_fetched_at'").fetchone() is None:
+            return None
+        return {row[0] for row in self.conn.execute("SELECT offer_id FROM ozon_offers")}
+
+    def save_ozon_offer_ids(self, offer_ids: Iterable[str]) -> None:
+        self.conn.execute("DELETE FROM ozon_offers")
+        self.conn.executemany(
+            "INSERT OR IGNORE INTO ozon_offers (offer_id) VALUES (?)",
+            [(offer_id,) for offer_id in offer_ids]
+        )
+        self.conn.execute(
+            "INSERT OR REPLACE INTO meta (key, value) VALUES ('ozon_fetched_at', ?)",
+            (str(time.time()),)
+        )
+        self.conn.commit()
+
+    # Articles
+    def load(self) -> Dict[str, ArticleState]:
+        return {
+            article: ArticleState(
+                status,
+                json.loads(category_id),
+                json.loads(scraped) if scraped else None,
+                json.loads(formatted) if formatted else None
+            )
+            for article, category_id, status, scraped, formatted in self.conn.execute(
+                "SELECT article, category_id, status, scraped, formatted FROM articles"
+            )
+        }
+
+    def mark_scraped(self, article: str, category_id: Any, product_info: Dict[str, Any]) -> None:
+        self.conn.execute(
+            "INSERT OR REPLACE INTO articles (article, category_id, status, scraped, updated_at) "
+            "VALUES (?, ?, ?, ?, ?)",
+            (article, json.dumps(category_id), SCRAPED, json.dumps(product_info, ensure_ascii=False), time.time())
+        )
+        self.conn.commit()
+
+    def mark_formatted(self, article: str, item: Dict[str, Any]) -> None:
+        self.conn.execute(
+            "UPDATE articles SET status = ?, formatted = ?, updated_at = ? WHERE article = ?",
+            (FORMATTED, json.dumps(item, ensure_ascii=False), time.time(), article)
+        )
+        self.conn.commit()
+
+    def mark_uploaded(self, articles: Iterable[str]) -> None:
+        """Ozon confirmed the import of these articles."""
+        now = time.time()
+        self.conn.executemany(
+            "UPDATE articles SET status = ?, updated_at = ? WHERE article = ?",
+            [(UPLOADED, now, article) for article in articles]
+        )
+        self.conn.commit()
+
+    def mark_failed(self, article: str, error: str, category_id: Any = None) -> None:
+        self.conn.execute(
+            "INSERT INTO articles (article, category_id, status, error, updated_at) VALUES (?, ?, ?, ?, ?) "
+            "ON CONFLICT (article) DO UPDATE SET status = excluded.status, error = excluded.error, "
+            "updated_at = excluded.updated_at",
+            (article, json.dumps(category_id), FAILED, error, time.time())
+        )
+        self.conn.commit()
+
+    def mark_unchanged(self, article: str, category_id: Any) -> None:
+        self.conn.execute(
+            "INSERT OR REPLACE INTO articles (article, category_id, status, updated_at) VALUES (?, ?, ?, ?)",
+            (article, json.dumps(category_id), UNCHANGED, time.time())
+        )
+        self.conn.commit()
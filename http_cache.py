@@ -0,0 +1,122 @@
+import os
+import time
+import zlib
+import sqlite3
+import logging
+from typing import NamedTuple, Optional
+
+# Persistent cache of supplier-site pages
+HTTP_CACHE_PATH = os.getenv("HTTP_CACHE_PATH", "http_cache.sqlite3")
+HTTP_CACHE_TTL = int(os.getenv("HTTP_CACHE_TTL", "86400"))
+HTTP_CACHE_MAX_BYTES = int(os.getenv("HTTP_CACHE_MAX_BYTES", str(200 * 1024 * 1024)))
+
+# Run eviction after this many writes
+EVICT_EVERY = 200
+
+
+class CachedResponse(NamedTuple):
+    body: str
+    etag: Optional[str]
+    last_modified: Optional[str]
+    fetched_at: float
+
+
+class HttpCache:
+    """
+    SQLite-backed response cache keyed by URL. Entries younger than the TTL
+    are served directly; older ones are revalidated with ETag/Last-Modified.
+    Bodies are stored zlib-compressed and the least recently used entries are
+    evicted once the total size exceeds `max_bytes`.
+    """
+
+    def __init__(
+        self,
+        path: str = HTTP_CACHE_PATH,
+        ttl: int = HTTP_CACHE_TTL,
+        max_bytes: int = HTTP_CACHE_MAX_BYTES
+    ):
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self._writes = 0
+        self.conn = sqlite3.connect(path)
+        self.conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS responses (
+                url           TEXT PRIMARY KEY,
+                body          BLOB NOT NULL,
+                etag          TEXT,
+                last_modified TEXT,
+                fetched_at    REAL NOT NULL,
+                accessed_at   REAL NOT NULL,
+                size          INTEGER NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed_at);
+            """
+        )
+        self.conn.commit()
+
+    def close(self) -> None:
+        self.evict()
+        self.conn.commit()
+        self.conn.close()
+
+    def get(self, url: str) -> Optional[CachedResponse]:
+        row = self.conn.execute(
+            "SELECT body, etag, last_modified, fetched_at FROM responses WHERE url = ?",
+            (url,)
+        ).fetchone()
+        if row is None:
+            return None
+        self.conn.execute("UPDATE responses SET accessed_at = ? WHERE url = ?", (time.time(), url))
+        body, etag, last_modified, fetched_at = row
+        return CachedResponse(zlib.decompress(body).decode("utf-8"), etag, last_modified, fetched_at)
+
+    def is_fresh(self, entry: CachedResponse) -> bool:
+        return time.time() - entry.fetched_at < self.ttl
+
+    def revalidation_headers(self, entry: CachedResponse) -> dict:
+        headers = {}
+        if entry.etag:
+            headers["If-None-Match"] = entry.etag
+        if entry.last_modified:
+            headers["If-Modified-Since"] = entry.last_modified
+        return headers
+
+    def put(self, url: str, body: str, etag: Optional[str], last_modified: Optional[str]) -> None:
+        data = zlib.compress(body.encode("utf-8"))
+        now = time.time()
+        self.conn.execute(
+            "INSERT OR REPLACE INTO responses "
+            "(url, body, etag, last_modified, fetched_at, accessed_at, size) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (url, data, etag, last_modified, now, now, len(data))
+        )
+        self.conn.commit()
+        self._writes += 1
+        if self._writes % EVICT_EVERY == 0:
+            self.evict()
+
+    def touch(self, url: str) -> None:
+        """Mark an entry as freshly revalidated (after a 304)."""
+        now = time.time()
+        self.conn.execute(
+            "UPDATE responses SET fetched_at = ?, accessed_at = ? WHERE url = ?",
+            (now, now, url)
+        )
+        self.conn.commit()
+
+    def evict(self) -> None:
+        total = self.conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        removed = 0
+        for url, size in self.conn.execute(
+            "SELECT url, size FROM responses ORDER BY accessed_at"
+        ).fetchall():
+            if total <= self.max_bytes:
+                break
+            self.conn.execute("DELETE FROM responses WHERE url = ?", (url,))
+            total -= size
+            removed += 1
+        self.conn.commit()
+        logging.info(f"HTTP cache: evicted {removed} entries")
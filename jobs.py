@@ -0,0 +1,93 @@
+import os
+import time
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional
+
+# Max number of heavy jobs (catalog sync + push) running at once
+JOBS_MAX_CONCURRENT = int(os.getenv("JOBS_MAX_CONCURRENT", "2"))
+
+
+class Job:
+    """A background job owned by one key (user or account)."""
+
+    def __init__(self, key: Hashable, description: str):
+        self.key = key
+        self.description = description
+        self.status = "queued"
+        self.created_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.task: Optional[asyncio.Task] = None
+        # Optional progress object shown by status queries
+        self.progress: Optional[Any] = None
+
+    @property
+    def active(self) -> bool:
+        return self.status in ("queued", "running")
+
+    @property
+    def elapsed(self) -> float:
+        if self.started_at is None:
+            return 0.0
+        return (self.finished_at or time.time()) - self.started_at
+
+
+class JobRunner:
+    """
+    Runs jobs as background tasks so message handlers return immediately.
+    At most `max_concurrent` jobs run at once (the rest wait queued) and each
+    key may have only one active job.
+    """
+
+    def __init__(self, max_concurrent: int = JOBS_MAX_CONCURRENT):
+        self._semaphore = asyncio.Semaphore(max_concurrent)
+        self._jobs: Dict[Hashable, Job] = {}
+
+    def get(self, key: Hashable) -> Optional[Job]:
+        """Return the active or most recently finished job for `key`."""
+        return self._jobs.get(key)
+
+    def submit(
+        self,
+        key: Hashable,
+        func: Callable[[], Awaitable[Any]],
+        description: str
+    ) -> Optional[Job]:
+        """Start `func()` in the background; returns None if `key` already has an active job."""
+        current = self._jobs.get(key)
+        if current is not None and current.active:
+            return None
+        job = Job(key, description)
+        job.task = asyncio.create_task(self._run(job, func))
+        self._jobs[key] = job
+        return job
+
+    def cancel(self, key: Hashable) -> bool:
+        job = self._jobs.get(key)
+        if job is None or not job.active or job.task is None:
+            return False
+        job.task.cancel()
+        return True
+
+    async def shutdown(self) -> None:
+        tasks = [job.task for job in self._jobs.values() if job.active and job.task]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def _run(self, job: Job, func: Callable[[], Awaitable[Any]]) -> None:
+        try:
+            async with self._semaphore:
+                job.status = "running"
+                job.started_at = time.time()
+                await func()
+            job.status = "done"
+        except asyncio.CancelledError:
+            job.status = "cancelled"
+            raise
+        except Exception:
+            logging.exception(f"Job {job.description!r} for {job.key} failed")
+            job.status = "failed"
+        finally:
+            job.finished_at = time.time()
@@ -1,30 +1,18 @@
-import os
-import aiohttp
 import asyncio
 import pandas as pd
 from dotenv import load_dotenv
 
-load_dotenv()
-
-OZON_API_KEY = os.getenv("OZON_API_KEY")
-OZON_CLIENT_ID = os.getenv("OZON_CLIENT_ID")
+from ozon_client import OzonClient
+from supplier_file import load_articles
 
-HEADERS = {
-    "Client-Id": OZON_CLIENT_ID,
-    "Api-Key": OZON_API_KEY,
-    "Content-Type": "application/json"
-}
+load_dotenv()
 
 def load_artikuls(file_path):
     """
-    Считывает из Excel столбец 'Группа' (начиная с 4-й строки заголовков)
-    и возвращает список строк-артикулов.
+    Считывает из Excel только столбец 'Группа' (строка заголовков ищется
+    автоматически) и возвращает список строк-артикулов.
     """
-    df = pd.read_excel(file_path, header=3)
-    df_filtered = df[['Группа']]
-    df_filtered.columns = ['Артикул']
-    df_filtered_cleaned = df_filtered.dropna(subset=['Артикул'])
-    return [str(value).strip() for value in df_filtered_cleaned['Артикул']]
+    return load_articles(file_path)
 
 async def fetch_all_products():
     """
@@ -32,34 +20,12 @@ async def fetch_all_products():
     возвращает список словарей, каждый из которых содержит, в том числе,
     ключ 'offer_id'.
     """
-    url_list = "https://api-seller.ozon.ru/v3/product/list"
-    url_info = "https://api-seller.ozon.ru/v3/product/info/list"
-    all_offer_ids = []
-    last_id = ""
-
-    async with aiohttp.ClientSession() as session:
-        # Сначала получаем все offer_id
-        while True:
-            payload = {
-                "filter": {"visibility": "ALL"},
-                "last_id": last_id,
-                "limit": 1000
-            }
-            async with session.post(url_list, headers=HEADERS, json=payload) as resp:
-                data = await resp.json()
-                items = data.get("result", {}).get("items", [])
-                all_offer_ids.extend([item["offer_id"] for item in items])
-                last_id = data["result"].get("last_id")
-                if not last_id:
-                    break
-
-        # Затем подтягиваем полную информацию порциями по 1000 offer_id
+    async with OzonClient() as client:
+        # Подтягиваем полную информацию порциями по 1000 offer_id,
+        # не дожидаясь конца постраничного обхода каталога
         products = []
-        for i in range(0, len(all_offer_ids), 1000):
-            batch = all_offer_ids[i:i+1000]
-            async with session.post(url_info, headers=HEADERS, json={"offer_id": batch}) as resp:
-                info = await resp.json()
-                products.extend(info.get("items", []))
+        async for items in client.iter_info_for_pages(client.iter_product_pages()):
+            products.extend(items)
 
         return products
 
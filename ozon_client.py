@@ -0,0 +1,205 @@
+import os
+import ssl
+import asyncio
+import logging
+from typing import Any, AsyncGenerator, AsyncIterable, Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+import aiohttp
+from aiohttp import ClientTimeout, TCPConnector
+
+# Ozon catalog endpoints
+PRODUCT_LIST_URL = "https://api-seller.ozon.ru/v3/product/list"
+PRODUCT_INFO_URL = "https://api-seller.ozon.ru/v3/product/info/list"
+
+# Connection pool settings
+OZON_POOL_SIZE = int(os.getenv("OZON_POOL_SIZE", "20"))
+OZON_DNS_TTL = int(os.getenv("OZON_DNS_TTL", "300"))
+OZON_KEEPALIVE_TIMEOUT = float(os.getenv("OZON_KEEPALIVE_TIMEOUT", "30"))
+OZON_TIMEOUT = float(os.getenv("OZON_TIMEOUT", "60"))
+
+# Concurrent product/info requests while paging the catalog
+OZON_INFO_CONCURRENCY = int(os.getenv("OZON_INFO_CONCURRENCY", "4"))
+
+
+class OzonClient:
+    """
+    Long-lived Ozon Seller API client owning one keep-alive connection pool.
+    Create it once per process and reuse `session` everywhere; works as an
+    async context manager for scripts.
+    """
+
+    def __init__(
+        self,
+        client_id: Optional[str] = None,
+        api_key: Optional[str] = None,
+        pool_size: int = OZON_POOL_SIZE
+    ):
+        # Read credentials lazily so scripts can call load_dotenv() after import
+        self.headers = {
+            "Client-Id": client_id or os.getenv("OZON_CLIENT_ID"),
+            "Api-Key": api_key or os.getenv("OZON_API_KEY"),
+            "Content-Type": "application/json"
+        }
+        self.pool_size = pool_size
+        self._session: Optional[aiohttp.ClientSession] = None
+
+    @property
+    def session(self) -> aiohttp.ClientSession:
+        if self._session is None or self._session.closed:
+            raise RuntimeError("OzonClient is not started")
+        return self._session
+
+    async def start(self) -> "OzonClient":
+        if self._session is not None and not self._session.closed:
+            return self
+        ssl_ctx = ssl.create_default_context()
+        ssl_ctx.check_hostname = False
+        ssl_ctx.verify_mode = ssl.CERT_NONE
+        connector = TCPConnector(
+            ssl=ssl_ctx,
+            limit=self.pool_size,
+            ttl_dns_cache=OZON_DNS_TTL,
+            keepalive_timeout=OZON_KEEPALIVE_TIMEOUT
+        )
+        self._session = aiohttp.ClientSession(
+            headers=self.headers,
+            connector=connector,
+            timeout=ClientTimeout(total=OZON_TIMEOUT)
+        )
+        logging.info(f"Ozon client started (pool size {self.pool_size})")
+        return self
+
+    async def close(self) -> None:
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+            logging.info("Ozon client closed")
+        self._session = None
+
+    async def __aenter__(self) -> "OzonClient":
+        return await self.start()
+
+    async def __aexit__(self, *exc) -> None:
+        await self.close()
+
+    # Requests
+    async def post(self, url: str, payload: Dict[str, Any], name: str) -> Dict[str, Any]:
+        """POST to Ozon and return the JSON body. Raises ValueError on bad request."""
+        async with self.session.post(url, json=payload) as resp:
+            if resp.status == 400:
+                text = await resp.text()
+                raise ValueError(f"Ошибка запроса к Ozon ({name}): {text}")
+            resp.raise_for_status()
+            return await resp.json()
+
+    async def _product_list_page(
+        self,
+        last_id: str,
+        visibility: str,
+        limit: int
+    ) -> Tuple[List[Dict[str, Any]], str]:
+        payload = {"filter": {"visibility": visibility}, "last_id": last_id, "limit": limit}
+        data = await self.post(PRODUCT_LIST_URL, payload, "product/list")
+        result = data.get("result", {}) or {}
+        return result.get("items", []) or [], result.get("last_id", "") or ""
+
+    async def _product_info_batch(self, offer_ids: List[str]) -> List[Dict[str, Any]]:
+        data = await self.post(PRODUCT_INFO_URL, {"offer_id": offer_ids}, "product/info")
+        return data.get("items", []) or []
+
+    # Streaming catalog access
+    async def iter_product_pages(
+        self,
+        visibility: str = "ALL",
+        limit: int = 1000
+    ) -> AsyncGenerator[List[Dict[str, Any]], None]:
+        """
+        Yield product/list pages one at a time. The next page is requested
+        while the caller processes the current one.
+        """
+        task: Optional[asyncio.Task] = asyncio.create_task(
+            self._product_list_page("", visibility, limit)
+        )
+        try:
+            while task is not None:
+                items, last_id = await task
+                task = None
+                if items and last_id:
+                    task = asyncio.create_task(self._product_list_page(last_id, visibility, limit))
+                if items:
+                    yield items
+        finally:
+            if task is not None:
+                task.cancel()
+
+    async def iter_product_info(
+        self,
+        offer_ids: Iterable[str],
+        batch_size: int = 1000
+    ) -> AsyncGenerator[List[Dict[str, Any]], None]:
+        """
+        Yield product/info/list results in batches of up to `batch_size` offer_ids,
+        prefetching the next batch while the caller processes the current one.
+        """
+        ids = list(offer_ids)
+        chunks = [ids[i:i + batch_size] for i in range(0, len(ids), batch_size)]
+        task: Optional[asyncio.Task] = None
+        try:
+            for i, chunk in enumerate(chunks):
+                if task is None:
+                    task = asyncio.create_task(self._product_info_batch(chunk))
+                items = await task
+                task = None
+                if i + 1 < len(chunks):
+                    task = asyncio.create_task(self._product_info_batch(chunks[i + 1]))
+                yield items
+        finally:
+            if task is not None:
+                task.cancel()
+
+    async def iter_info_for_pages(
+        self,
+        pages: AsyncIterable[List[Dict[str, Any]]],
+        select: Optional[Callable[[List[Dict[str, Any]]], Iterable[str]]] = None,
+        concurrency: int = OZON_INFO_CONCURRENCY,
+        batch_size: int = 1000
+    ) -> AsyncGenerator[List[Dict[str, Any]], None]:
+        """
+        Two-stage pipeline: every product/list page is handed straight to a
+        bounded pool of product/info fetchers, so listing and detail fetching
+        overlap. `select` picks the offer_ids of a page that need info (all by
+        default). Info batches are yielded in completion order.
+        """
+        semaphore = asyncio.Semaphore(concurrency)
+        pending: Set[asyncio.Task] = set()
+
+        async def fetch(offer_ids: List[str]) -> List[Dict[str, Any]]:
+            async with semaphore:
+                return await self._product_info_batch(offer_ids)
+
+        try:
+            async for page in pages:
+                ids = list(select(page)) if select else [item["offer_id"] for item in page]
+                for i in range(0, len(ids), batch_size):
+                    pending.add(asyncio.create_task(fetch(ids[i:i + batch_size])))
+                # Hand back whatever finished; block only when the pool is saturated
+                done = {task for task in pending if task.done()}
+                if len(pending) - len(done) >= 2 * concurrency:
+                    done, _ = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    pending.discard(task)
+                    yield task.result()
+            while pending:
+                done, _ = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    pending.discard(task)
+                    yield task.result()
+        finally:
+            for task in pending:
+                task.cancel()
+
+    async def fetch_offer_ids(self) -> List[str]:
+        """Return every offer_id in the store, in product/list order."""
+        offer_ids: List[str] = []
+        async for page in self.iter_product_pages():
+            offer_ids.extend(item["offer_id"] for item in page)
+        return offer_ids
@@ -0,0 +1,203 @@
+import os
+import time
+import random
+import asyncio
+import logging
+from email.utils import parsedate_to_datetime
+from typing import Any, AsyncGenerator, AsyncIterable, Dict, List, NamedTuple, Optional, Set, Tuple
+
+import aiohttp
+from aiohttp import ClientResponseError
+
+from rate_limit import TokenBucket
+
+# Ozon update endpoints; the payload key matches the endpoint name
+ENDPOINT_URLS = {
+    "prices": "https://api-seller.ozon.ru/v1/product/import/prices",
+    "stocks": "https://api-seller.ozon.ru/v2/products/stocks",
+}
+
+# Columns of the update frame sent to each endpoint
+ENDPOINT_FIELDS = {
+    "prices": ["offer_id", "price", "old_price"],
+    "stocks": ["offer_id", "stock", "warehouse_id"],
+}
+
+# Max items per request: import/prices takes up to 1000, products/stocks up to 100
+ENDPOINT_BATCH_SIZES = {
+    "prices": int(os.getenv("OZON_PRICES_BATCH_SIZE", "1000")),
+    "stocks": int(os.getenv("OZON_STOCKS_BATCH_SIZE", "100")),
+}
+
+# Dispatcher settings
+OZON_MAX_IN_FLIGHT = int(os.getenv("OZON_MAX_IN_FLIGHT", "8"))
+OZON_PRICES_RPS = float(os.getenv("OZON_PRICES_RPS", "10"))
+OZON_STOCKS_RPM = float(os.getenv("OZON_STOCKS_RPM", "80"))
+
+# Retry settings
+OZON_MAX_RETRIES = int(os.getenv("OZON_MAX_RETRIES", "5"))
+OZON_BACKOFF_BASE = float(os.getenv("OZON_BACKOFF_BASE", "1"))
+OZON_BACKOFF_MAX = float(os.getenv("OZON_BACKOFF_MAX", "60"))
+
+# Whole-request statuses and per-item error codes worth retrying
+TRANSIENT_STATUSES = {429, 500, 502, 503, 504}
+TRANSIENT_ERROR_CODES = {
+    "TOO_MANY_REQUESTS",
+    "RATE_LIMIT",
+    "INTERNAL_ERROR",
+    "TIMEOUT",
+    "SERVICE_UNAVAILABLE",
+}
+
+
+class BatchResult(NamedTuple):
+    endpoint: str
+    records: List[Dict[str, Any]]
+    updated: List[Dict[str, Any]]
+    failed: List[Dict[str, Any]]
+    attempt: int
+
+
+def default_rate_limits() -> Dict[str, TokenBucket]:
+    """One bucket per endpoint, sized after Ozon's per-method quotas."""
+    return {
+        "prices": TokenBucket(OZON_PRICES_RPS, capacity=max(1.0, OZON_PRICES_RPS)),
+        "stocks": TokenBucket(OZON_STOCKS_RPM / 60, capacity=5),
+    }
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Parse a Retry-After header given either in seconds or as an HTTP date."""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def backoff_delay(attempt: int, retry_after: Optional[float] = None) -> float:
+    """Exponential backoff with full jitter; an explicit Retry-After wins."""
+    if retry_after is not None:
+        return retry_after + random.uniform(0, 1)
+    return random.uniform(0, min(OZON_BACKOFF_MAX, OZON_BACKOFF_BASE * 2 ** attempt))
+
+
+def split_item_results(
+    endpoint: str,
+    records: List[Dict[str, Any]],
+    data: Dict[str, Any]
+) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]], List[Dict[str, Any]]]:
+    """
+    Match Ozon's per-item `result` list to the sent records.
+    Returns (updated, failed, retry).
+    """
+    results = data.get("result")
+    if not isinstance(results, list):
+        return list(records), [], []
+    by_offer = {item.get("offer_id"): item for item in results}
+    updated, failed, retry = [], [], []
+    for rec in records:
+        item = by_offer.get(rec["offer_id"])
+        if item is None:
+            failed.append(rec)
+        elif item.get("updated"):
+            updated.append(rec)
+        else:
+            errors = item.get("errors") or []
+            if any(err.get("code") in TRANSIENT_ERROR_CODES for err in errors):
+                retry.append(rec)
+            else:
+                logging.warning(f"Ozon rejected {endpoint} for {rec['offer_id']}: {errors}")
+                failed.append(rec)
+    return updated, failed, retry
+
+
+async def send_batch(
+    session: aiohttp.ClientSession,
+    endpoint: str,
+    records: List[Dict[str, Any]],
+    bucket: TokenBucket,
+    attempt: int = 0
+) -> Tuple[BatchResult, List[Dict[str, Any]], Optional[float]]:
+    """
+    Send one batch and classify every record.
+    Returns (result, records to retry, Retry-After seconds if the server sent one).
+    """
+    await bucket.acquire()
+    try:
+        async with session.post(ENDPOINT_URLS[endpoint], json={endpoint: records}) as resp:
+            if resp.status in TRANSIENT_STATUSES:
+                logging.warning(f"Ozon API {resp.status} ({endpoint}), will retry {len(records)} items")
+                retry_after = parse_retry_after(resp.headers.get("Retry-After"))
+                return BatchResult(endpoint, records, [], [], attempt), records, retry_after
+            resp.raise_for_status()
+            data = await resp.json()
+    except ClientResponseError as e:
+        logging.error(f"Ozon API error ({endpoint}): {e.status} - {e.message}")
+        return BatchResult(endpoint, records, [], records, attempt), [], None
+    except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+        logging.warning(f"Network error sending {endpoint} batch: {e!r}")
+        return BatchResult(endpoint, records, [], [], attempt), records, None
+    except Exception:
+        logging.exception(f"Unexpected error sending {endpoint} batch")
+        return BatchResult(endpoint, records, [], records, attempt), [], None
+    updated, failed, retry = split_item_results(endpoint, records, data)
+    return BatchResult(endpoint, records, updated, failed, attempt), retry, None
+
+
+async def dispatch_batches(
+    session: aiohttp.ClientSession,
+    jobs: AsyncIterable[Tuple[str, Dict[str, list]]],
+    rate_limits: Dict[str, TokenBucket],
+    max_in_flight: int = OZON_MAX_IN_FLIGHT,
+    max_retries: int = OZON_MAX_RETRIES
+) -> AsyncGenerator[BatchResult, None]:
+    """
+    Send (endpoint, payload) jobs keeping up to `max_in_flight` requests open,
+    each endpoint throttled by its own bucket. Results are yielded as soon as
+    each attempt completes; transiently failed items are re-queued with backoff
+    and only reported as failed once `max_retries` is exhausted.
+    """
+    semaphore = asyncio.Semaphore(max_in_flight)
+    pending: Set[asyncio.Task] = set()
+
+    async def attempt(endpoint: str, records: List[Dict[str, Any]], n: int, delay: float):
+        if delay:
+            await asyncio.sleep(delay)
+        async with semaphore:
+            return await send_batch(session, endpoint, records, rate_limits[endpoint], n)
+
+    def handle(task: asyncio.Task) -> BatchResult:
+        result, retry, retry_after = task.result()
+        if retry and result.attempt < max_retries:
+            delay = backoff_delay(result.attempt, retry_after)
+            pending.add(asyncio.create_task(
+                attempt(result.endpoint, retry, result.attempt + 1, delay)
+            ))
+        elif retry:
+            logging.error(f"Giving up on {len(retry)} {result.endpoint} items after {result.attempt + 1} attempts")
+            result = result._replace(failed=result.failed + retry)
+        return result
+
+    try:
+        async for endpoint, payload in jobs:
+            # Sleeping retries don't hold a connection, so allow some slack
+            while len(pending) >= 2 * max_in_flight:
+                done, _ = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    pending.discard(task)
+                    yield handle(task)
+            pending.add(asyncio.create_task(attempt(endpoint, payload[endpoint], 0, 0)))
+        while pending:
+            done, _ = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                pending.discard(task)
+                yield handle(task)
+    finally:
+        for task in pending:
+            task.cancel()
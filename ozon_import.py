@@ -0,0 +1,154 @@
+import os
+import time
+import asyncio
+import logging
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Set
+
+import aiohttp
+from aiohttp import ClientResponseError
+
+from ozon_client import OzonClient
+from ozon_dispatch import OZON_MAX_RETRIES, TRANSIENT_STATUSES, backoff_delay
+
+# Ozon card import endpoints
+PRODUCT_IMPORT_URL = "https://api-seller.ozon.ru/v3/product/import"
+IMPORT_INFO_URL = "https://api-seller.ozon.ru/v1/product/import/info"
+
+# Parallel product/import and import/info requests
+OZON_IMPORT_CONCURRENCY = int(os.getenv("OZON_IMPORT_CONCURRENCY", "4"))
+
+# Task polling: first/shortest delay, longest delay, give up after
+OZON_IMPORT_POLL_MIN = float(os.getenv("OZON_IMPORT_POLL_MIN", "2"))
+OZON_IMPORT_POLL_MAX = float(os.getenv("OZON_IMPORT_POLL_MAX", "30"))
+OZON_IMPORT_POLL_TIMEOUT = float(os.getenv("OZON_IMPORT_POLL_TIMEOUT", "1800"))
+
+# Per-item statuses of import/info that mean the item is finished
+IMPORT_DONE_STATUSES = {"imported", "skipped"}
+IMPORT_FAILED_STATUSES = {"failed"}
+
+
+class ImportResult(NamedTuple):
+    task_id: Optional[int]
+    offer_ids: List[str]
+    imported: List[str]
+    failed: Dict[str, List[Dict[str, Any]]]
+    pending: List[str]
+
+
+def split_import_info(task_id: int, offer_ids: List[str], items: List[Dict[str, Any]]) -> ImportResult:
+    """Classify import/info items; offers missing from the answer count as pending."""
+    by_offer = {item.get("offer_id"): item for item in items}
+    imported, failed, pending = [], {}, []
+    for offer_id in offer_ids:
+        item = by_offer.get(offer_id)
+        status = item.get("status") if item else None
+        if status in IMPORT_DONE_STATUSES:
+            imported.append(offer_id)
+        elif status in IMPORT_FAILED_STATUSES:
+            failed[offer_id] = item.get("errors") or []
+        else:
+            pending.append(offer_id)
+    return ImportResult(task_id, offer_ids, imported, failed, pending)
+
+
+class ProductImporter:
+    """
+    Submits product/import batches concurrently and polls every returned
+    task in the background. Polling backs off while a task makes no progress
+    and speeds up again once items change status. `on_result` is called with
+    every finished task's ImportResult; call `wait` at the end to collect them
+    all.
+    """
+
+    def __init__(
+        self,
+        client: OzonClient,
+        concurrency: int = OZON_IMPORT_CONCURRENCY,
+        poll_min: float = OZON_IMPORT_POLL_MIN,
+        poll_max: float = OZON_IMPORT_POLL_MAX,
+        poll_timeout: float = OZON_IMPORT_POLL_TIMEOUT,
+        max_retries: int = OZON_MAX_RETRIES,
+        on_result: Optional[Callable[[ImportResult], None]] = None
+    ):
+        self.client = client
+        self.poll_min = poll_min
+        self.poll_max = poll_max
+        self.poll_timeout = poll_timeout
+        self.max_retries = max_retries
+        self.on_result = on_result
+        self._semaphore = asyncio.Semaphore(concurrency)
+        self._polls: Set[asyncio.Task] = set()
+        self.results: List[ImportResult] = []
+
+    async def _post(self, url: str, payload: Dict[str, Any], name: str) -> Dict[str, Any]:
+        for attempt in range(self.max_retries + 1):
+            try:
+                async with self._semaphore:
+                    return await self.client.post(url, payload, name)
+            except ClientResponseError as e:
+                if e.status not in TRANSIENT_STATUSES or attempt == self.max_retries:
+                    raise
+                logging.warning(f"Ozon API {e.status} ({name}), retrying")
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                if attempt == self.max_retries:
+                    raise
+                logging.warning(f"Network error ({name}): {e!r}, retrying")
+            await asyncio.sleep(backoff_delay(attempt))
+
+    async def upload(self, payload: Dict[str, Any]) -> Optional[int]:
+        """Submit one product/import batch and start polling its task; returns the task_id."""
+        offer_ids = [item["offer_id"] for item in payload["items"]]
+        try:
+            data = await self._post(PRODUCT_IMPORT_URL, payload, "product/import")
+            task_id = data["result"]["task_id"]
+        except Exception as e:
+            logging.error(f"Ошибка загрузки {len(offer_ids)} товаров: {e}")
+            self._finish(ImportResult(None, offer_ids, [], {o: [{"message": str(e)}] for o in offer_ids}, []))
+            return None
+        logging.info(f"Импорт {len(offer_ids)} товаров принят, task_id {task_id}")
+        task = asyncio.create_task(self._poll(task_id, offer_ids))
+        self._polls.add(task)
+        task.add_done_callback(self._polls.discard)
+        return task_id
+
+    async def _poll(self, task_id: int, offer_ids: List[str]) -> None:
+        deadline = time.monotonic() + self.poll_timeout
+        delay = self.poll_min
+        finished = 0
+        result = ImportResult(task_id, offer_ids, [], {}, list(offer_ids))
+        while result.pending and time.monotonic() < deadline:
+            await asyncio.sleep(delay)
+            try:
+                data = await self._post(IMPORT_INFO_URL, {"task_id": task_id}, "product/import/info")
+            except Exception as e:
+                logging.warning(f"Не удалось получить статус импорта {task_id}: {e}")
+                delay = min(self.poll_max, delay * 2)
+                continue
+            items = (data.get("result") or {}).get("items") or []
+            result = split_import_info(task_id, offer_ids, items)
+            now_finished = len(offer_ids) - len(result.pending)
+            delay = self.poll_min if now_finished > finished else min(self.poll_max, delay * 2)
+            finished = now_finished
+        if result.pending:
+            logging.warning(f"Импорт {task_id}: {len(result.pending)} товаров не обработано за {self.poll_timeout:.0f} с")
+        for offer_id, errors in result.failed.items():
+            logging.warning(f"Импорт {task_id}: ошибка по {offer_id}: {errors}")
+        self._finish(result)
+
+    def _finish(self, result: ImportResult) -> None:
+        self.results.append(result)
+        if self.on_result is not None:
+            try:
+                self.on_result(result)
+            except Exception:
+                logging.exception(f"Import result handler failed for task {result.task_id}")
+
+    async def wait(self) -> List[ImportResult]:
+        """Wait for every submitted task to finish polling and return all results."""
+        while self._polls:
+            await asyncio.gather(*list(self._polls))
+        imported = sum(len(r.imported) for r in self.results)
+        failed = sum(len(r.failed) for r in self.results)
+        pending = sum(len(r.pending) for r in self.results)
+        logging.info(f"Импорт завершён: загружено {imported}, ошибок {failed}, без ответа {pending}")
+        return self.results
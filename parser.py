@@ -1,135 +1,191 @@
 import os
+import json
 import aiohttp
 import asyncio
-import pandas as pd
-import ssl
-import requests
-from bs4 import BeautifulSoup
-import re
+from concurrent.futures import ProcessPoolExecutor
+from urllib.parse import urlsplit
 from dotenv import load_dotenv
 from tqdm import tqdm
 import logging
-import time
 
-load_dotenv()
+from atpump_html import parse_product, parse_search
+from crawl_state import FINISHED_STATUSES, CrawlState
+from http_cache import HttpCache
+from ozon_client import OzonClient
+from ozon_import import ProductImporter
+from product_index import ProductIndex, content_hash
+from rate_limit import TokenBucket
+from supplier_file import iter_categorized_articles, load_articles
 
-OZON_API_KEY = os.getenv("OZON_API_KEY")
-OZON_CLIENT_ID = os.getenv("OZON_CLIENT_ID")
+load_dotenv()
 
-HEADERS = {
-    "Client-Id": OZON_CLIENT_ID,
-    "Api-Key": OZON_API_KEY,
-    "Content-Type": "application/json"
+SITE_URL = "https://atpump.ru"
+
+# Crawler settings: parallel requests, requests per second per host, timeout
+CRAWL_CONCURRENCY = int(os.getenv("CRAWL_CONCURRENCY", "10"))
+CRAWL_RPS = float(os.getenv("CRAWL_RPS", "5"))
+CRAWL_TIMEOUT = float(os.getenv("CRAWL_TIMEOUT", "30"))
+
+# Worker processes for HTML parsing (0 parses inline on the event loop)
+PARSER_PROCESSES = int(os.getenv("PARSER_PROCESSES", "0"))
+
+# Pipeline settings: queue bound between stages, items per import request,
+# parallel uploads
+PIPELINE_QUEUE_SIZE = int(os.getenv("PIPELINE_QUEUE_SIZE", "200"))
+UPLOAD_BATCH_SIZE = int(os.getenv("UPLOAD_BATCH_SIZE", "100"))
+UPLOAD_WORKERS = int(os.getenv("UPLOAD_WORKERS", "2"))
+
+# Also re-crawl articles already on Ozon and re-upload the changed ones
+PARSER_UPDATE_EXISTING = os.getenv("PARSER_UPDATE_EXISTING", "0") == "1"
+
+# Supplier section headers -> Ozon category; 'del' sections are not imported
+CATEGORY_IDS = {
+    'А   Дренажные насосы': 91462,
+    'Б   Колодезные насосы': 970731315,
+    'В   Фекальные насосы': 98338,
+    'Г   Скважинные насосы': 970731316,
+    'Д   Самовсасывающие насосы': 91466,
+    'Е   Вихревые насосы': 91471,
+    'Ж   Центробежные': 91466,
+    'З   Многоступенчатые': 91471,
+    'К   Нас. авт.станц': 'del',
+    'Л   Нас. авт.станц. с защ. с/сх': 'del',
+    'М   Баки': 'del',
+    'Н   Аксессуары': 'del',
+    'О   Пульты': 99332,
+    'П   Станции управления': 99332,
+    'Р   Комбипрессы': 'del',
+    'С   Установка SAR': 'del',
+    '*   Гидравлика': 'del',
+    '*   Электродвигатели': 'del',
+    'Артикул': 'del'
 }
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-async def fetch_all_products():
-    url_list = "https://api-seller.ozon.ru/v3/product/list"
-    all_offer_ids = []
-    last_id = ""
-
-    async with aiohttp.ClientSession() as session:
-        while True:
-            payload = {"filter": {"visibility": "ALL"}, "last_id": last_id, "limit": 1000}
-            async with session.post(url_list, headers=HEADERS, json=payload) as resp:
-                data = await resp.json()
-                items = data.get("result", {}).get("items", [])
-                if not items:
-                    break
-                all_offer_ids.extend([item["offer_id"] for item in items])
-                last_id = data["result"].get("last_id", "")
-                if not last_id:
-                    break
-
-    return set(all_offer_ids)
+async def fetch_all_products(client):
+    return set(await client.fetch_offer_ids())
 
 def load_artikuls(file_path):
-    df = pd.read_excel(file_path, header=3)
-    df_filtered = df[['Группа']]
-    df_filtered.columns = ['Артикул']
-    df_filtered_cleaned = df_filtered.dropna(subset=['Артикул'])
-    return [str(value).strip() for value in df_filtered_cleaned['Артикул']]
-
-def search_product(article, category_id):
-    search_url = f"https://atpump.ru/search/?query={article}"
-    headers = {"User-Agent": "Mozilla/5.0"}
+    return load_articles(file_path)
+
+class Crawler:
+    """
+    Shared aiohttp session for atpump.ru with a concurrency limit, a per-host
+    politeness rate limit and request timeouts. With an HttpCache, fresh pages
+    are served locally and stale ones are revalidated with conditional GETs.
+    With `processes` > 0, HTML parsing runs in a process pool.
+    """
+
+    def __init__(
+        self,
+        concurrency=CRAWL_CONCURRENCY,
+        rps=CRAWL_RPS,
+        timeout=CRAWL_TIMEOUT,
+        cache=None,
+        processes=PARSER_PROCESSES
+    ):
+        self.concurrency = concurrency
+        self.rps = rps
+        self.timeout = timeout
+        self.cache = cache
+        self.processes = processes
+        self.session = None
+        self._pool = None
+        self._semaphore = asyncio.Semaphore(concurrency)
+        self._hosts = {}
+
+    async def __aenter__(self):
+        connector = aiohttp.TCPConnector(ssl=False, limit=self.concurrency, ttl_dns_cache=300)
+        self.session = aiohttp.ClientSession(
+            headers={"User-Agent": "Mozilla/5.0"},
+            connector=connector,
+            timeout=aiohttp.ClientTimeout(total=self.timeout)
+        )
+        if self.processes > 0:
+            self._pool = ProcessPoolExecutor(max_workers=self.processes)
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.session.close()
+        if self._pool is not None:
+            self._pool.shutdown(cancel_futures=True)
+
+    async def parse(self, func, *args):
+        """Run a parsing function inline or in the process pool."""
+        if self._pool is None:
+            return func(*args)
+        return await asyncio.get_running_loop().run_in_executor(self._pool, func, *args)
+
+    def _bucket(self, url):
+        host = urlsplit(url).netloc
+        if host not in self._hosts:
+            self._hosts[host] = TokenBucket(self.rps, capacity=max(1.0, self.rps))
+        return self._hosts[host]
+
+    async def fetch(self, url):
+        """Return the page text, or None unless the response is 200 (or 304 from cache)."""
+        entry = self.cache.get(url) if self.cache else None
+        if entry and self.cache.is_fresh(entry):
+            return entry.body
+        headers = self.cache.revalidation_headers(entry) if entry else {}
+        async with self._semaphore:
+            await self._bucket(url).acquire()
+            async with self.session.get(url, headers=headers) as response:
+                if response.status == 304 and entry:
+                    self.cache.touch(url)
+                    return entry.body
+                if response.status != 200:
+                    return None
+                text = await response.text()
+        if self.cache:
+            self.cache.put(url, text, response.headers.get("ETag"), response.headers.get("Last-Modified"))
+        return text
+
+class FetchError(Exception):
+    """A supplier page could not be fetched or parsed; worth retrying later."""
+
+async def search_product(crawler, article, category_id):
+    """
+    Return the card of `article`, or None if the site has no matching search
+    result. Raises FetchError on non-200 responses, timeouts and parse errors.
+    """
+    search_url = f"{SITE_URL}/search/?query={article}"
 
     try:
-        ssl_context = ssl.create_default_context()
-        ssl_context.check_hostname = False
-        ssl_context.verify_mode = ssl.CERT_NONE
-
-        with requests.Session() as session:
-            session.headers.update(headers)
-            session.verify = False
-            response = session.get(search_url)
-            if response.status_code != 200:
-                return None
-
-            soup = BeautifulSoup(response.text, "html.parser")
-            product_blocks = soup.select(".product-list__item")
-
-            for item in product_blocks:
-                code_div = item.select_one(".product-code")
-                if code_div:
-                    match = re.search(r"Артикул[:\s]*([A-Z0-9\-]+)", code_div.get_text())
-                    site_article = match.group(1).strip() if match else None
-                    if site_article and article == site_article:
-                        link_tag = item.select_one("a.product-list__name")
-                        if link_tag and link_tag.has_attr("href"):
-                            product_url = f"https://atpump.ru{link_tag['href']}"
-                            product_response = session.get(product_url)
-                            if product_response.status_code != 200:
-                                continue
-
-                            product_soup = BeautifulSoup(product_response.text, "html.parser")
-                            title_tag = product_soup.find("div", class_="content-head__title").find("h1")
-                            title = title_tag.text.strip() if title_tag else ""
-
-                            price_tag = product_soup.find("div", class_="price")
-                            price = price_tag["data-price"].strip() if price_tag and price_tag.has_attr("data-price") else price_tag.text.strip() if price_tag else "0"
-
-                            description_tag = product_soup.find("div", class_="product-card__description")
-                            description = [s.replace('\n', ' ') for s in description_tag.stripped_strings] if description_tag else []
-
-                            tech_description_tag = description_tag.find("a", href=True, string=re.compile("Скачать техническое описание")) if description_tag else None
-                            if tech_description_tag:
-                                description.append(f"Ссылка на тех. описание: {tech_description_tag['href']}")
-
-                            features_table = product_soup.find("table", class_="product_features")
-                            attributes = []
-                            if features_table:
-                                for row in features_table.find_all("tr", class_="product_features-item"):
-                                    feature_name = row.find("td", class_="product_features-title")
-                                    feature_value = row.find("td", class_="product_features-value")
-                                    if feature_name and feature_value:
-                                        attributes.append({"id": feature_name.text.strip(), "value": feature_value.text.strip()})
-
-                            images = []
-                            image_tags = product_soup.find_all("a", class_="js-product-image-popup", href=True)
-                            for img in image_tags:
-                                img_url = img["href"]
-                                if img_url and img_url.startswith("/"):
-                                    img_url = "https://atpump.ru" + img_url
-                                images.append(img_url)
-
-                            return {
-                                "offer_id": article,
-                                "name": title,
-                                "price": int(price.replace(" ", "")),
-                                "currency_code": "RUB",
-                                "vat": "0",
-                                "type_id": category_id,
-                                "description": description,
-                                "images": images,
-                                "attributes": attributes
-                            }
+        html = await crawler.fetch(search_url)
+        if html is None:
+            raise FetchError(f"страница поиска недоступна: {search_url}")
+
+        unavailable = None
+        for href in await crawler.parse(parse_search, html, article):
+            product_url = f"{SITE_URL}{href}"
+            product_html = await crawler.fetch(product_url)
+            if product_html is None:
+                unavailable = product_url
+                continue
 
+            product = await crawler.parse(parse_product, product_html, SITE_URL)
+            return {
+                "offer_id": article,
+                "name": product["name"],
+                "price": product["price"],
+                "currency_code": "RUB",
+                "vat": "0",
+                "type_id": category_id,
+                "description": product["description"],
+                "images": product["images"],
+                "attributes": product["attributes"]
+            }
+    except FetchError:
+        raise
     except Exception as e:
-        logger.error(f"Ошибка при обработке артикула {article}: {e}")
-        return None
+        raise FetchError(str(e) or repr(e)) from e
+
+    if unavailable:
+        raise FetchError(f"страница товара недоступна: {unavailable}")
+    return None
 
 def clean_value(value):
     units_to_remove = [" В", " м", " кг", " л", " мм", " см", " г", " м³", " Вт", " бар", "кВт"]
@@ -142,154 +198,251 @@ def clean_value(value):
                 return str(int(float(value.replace(unit, "").strip())))
     return value
 
+OZON_ATTRIBUTES = {
+    'Диаметр': 12508,
+    'Диаметр прохождения твердых частиц': None,
+    'Применение': None,
+    'Длина кабеля': 5391,
+    'Напряжение': 8542,
+    'Вес': 'weight',
+    'Степень защиты': 5269,
+    'Материал ведущего вала': None,
+    'Мощность': 4851,
+    'Ширина': 'width',
+    'Высота': 'height',
+    'Максимальная глубина погружения': 7464,
+    'Уровень остатка воды': None,
+    'Максимальный напор': 7465,
+    'Длина': 'depth',
+    'Тип насоса': 8229,
+    'Максимальная подача': None,
+    'Производитель двигателя': None,
+    'Поплавковый выключатель': None,
+    'Соединение': None,
+    'Материал корпуса': 5156,
+    'Рабочее колесо': None,
+    'Опорное колено': None
+}
+
 def format_for_ozon(data):
-    ozon_attributes = {
-        'Диаметр': 12508,
-        'Диаметр прохождения твердых частиц': None,
-        'Применение': None,
-        'Длина кабеля': 5391,
-        'Напряжение': 8542,
-        'Вес': 'weight',
-        'Степень защиты': 5269,
-        'Материал ведущего вала': None,
-        'Мощность': 4851,
-        'Ширина': 'width',
-        'Высота': 'height',
-        'Максимальная глубина погружения': 7464,
-        'Уровень остатка воды': None,
-        'Максимальный напор': 7465,
-        'Длина': 'depth',
-        'Тип насоса': 8229,
-        'Максимальная подача': None,
-        'Производитель двигателя': None,
-        'Поплавковый выключатель': None,
-        'Соединение': None,
-        'Материал корпуса': 5156,
-        'Рабочее колесо': None,
-        'Опорное колено': None
+    return {"items": [format_item(item) for item in data.get("items", [])]}
+
+def format_item(item):
+    formatted_item = {
+        "attributes": [],
+        "barcode": "",
+        "description_category_id": 83625738,
+        "new_description_category_id": 0,
+        "color_image": "",
+        "complex_attributes": [],
+        "currency_code": "RUB",
+        "depth": 120,
+        "dimension_unit": "mm",
+        "height": 120,
+        "images": item.get("images", []),
+        "images360": [],
+        "name": item.get("name", ""),
+        "offer_id": item.get("offer_id", ""),
+        "old_price": str(int(int(item.get("price", 0)) * 1.2)),
+        "pdf_list": [],
+        "price": str(item.get("price", 0)),
+        "primary_image": "",
+        "type_id": item.get("type_id", ""),
+        "vat": "0.2",
+        "weight": 2500,
+        "weight_unit": "g",
+        "width": 120
     }
 
-    formatted_items = []
-    for item in data.get("items", []):
-        formatted_item = {
-            "attributes": [],
-            "barcode": "",
-            "description_category_id": 83625738,
-            "new_description_category_id": 0,
-            "color_image": "",
-            "complex_attributes": [],
-            "currency_code": "RUB",
-            "depth": 120,
-            "dimension_unit": "mm",
-            "height": 120,
-            "images": item.get("images", []),
-            "images360": [],
-            "name": item.get("name", ""),
-            "offer_id": item.get("offer_id", ""),
-            "old_price": str(int(int(item.get("price", 0)) * 1.2)),
-            "pdf_list": [],
-            "price": str(item.get("price", 0)),
-            "primary_image": "",
-            "type_id": item.get("type_id", ""),
-            "vat": "0.2",
-            "weight": 2500,
-            "weight_unit": "g",
-            "width": 120
-        }
-
-        for attribute in item.get("attributes", []):
-            attr_id = ozon_attributes.get(attribute["id"])
-            if attr_id is None:
+    for attribute in item.get("attributes", []):
+        attr_id = OZON_ATTRIBUTES.get(attribute["id"])
+        if attr_id is None:
+            continue
+        cleaned_value = clean_value(attribute["value"])
+        if attr_id == 'weight':
+            formatted_item["weight"] = int(cleaned_value)
+        elif attr_id == 'width':
+            formatted_item["width"] = int(cleaned_value)
+        elif attr_id == 'height':
+            formatted_item["height"] = int(cleaned_value)
+        elif attr_id == 'depth':
+            formatted_item["depth"] = int(cleaned_value)
+        elif attr_id:
+            formatted_item["attributes"].append({
+                "complex_id": 0,
+                "id": attr_id,
+                "values": [{"value": cleaned_value}]
+            })
+
+    formatted_item["attributes"].append({
+        "complex_id": 0,
+        "id": 9048,
+        "values": [{"value": item.get("name", "")}]
+    })
+    formatted_item["attributes"].append({
+        "complex_id": 0,
+        "id": 85,
+        "values": [{"value": "Pedrollo"}]
+    })
+
+    return formatted_item
+
+
+async def run_pipeline(
+    crawler,
+    candidates,
+    upload,
+    state=None,
+    index=None,
+    fetchers=CRAWL_CONCURRENCY,
+    uploaders=UPLOAD_WORKERS,
+    batch_size=UPLOAD_BATCH_SIZE,
+    queue_size=PIPELINE_QUEUE_SIZE
+):
+    """
+    Crawl -> format -> upload with bounded queues between the stages, so a
+    slow stage holds back the ones before it and uploads overlap the crawl.
+    `candidates` yields (article, category_id) and is consumed lazily, so
+    crawling starts on the first candidate; `upload` is awaited with one
+    formatted batch and returns None if it was not accepted. With a
+    CrawlState scraping and formatting are checkpointed and a resumed run
+    skips finished articles and reuses scraped/formatted payloads; cards stay
+    'formatted' until the caller records the confirmed import result. With a
+    ProductIndex only cards whose content hash changed since their last
+    confirmed import are passed on; hashes of uploaded batches are staged for
+    the caller to confirm.
+    """
+    articles = asyncio.Queue(maxsize=queue_size)
+    scraped = asyncio.Queue(maxsize=queue_size)
+    payloads = asyncio.Queue(maxsize=uploaders)
+    checkpoints = state.load() if state else {}
+    hashes = {}
+    total = len(candidates) if hasattr(candidates, "__len__") else None
+    bar = tqdm(total=total, desc="Обработка артикулов", unit="товар")
+
+    async def feed():
+        for article, category in candidates:
+            checkpoint = checkpoints.get(article)
+            if checkpoint is None:
+                await articles.put((article, category))
+            elif checkpoint.status in FINISHED_STATUSES:
+                bar.update()
+            else:
+                bar.update()
+                hashes[article] = content_hash(checkpoint.scraped)
+                await scraped.put((article, checkpoint.scraped, checkpoint.formatted))
+        for _ in range(fetchers):
+            await articles.put(None)
+
+    async def fetch():
+        while (candidate := await articles.get()) is not None:
+            article, category = candidate
+            try:
+                product_info = await search_product(crawler, article, category_id=category)
+            except FetchError as e:
+                # Not checkpointed, so a resumed run tries the article again
+                logger.error(f"Ошибка при обработке артикула {article}: {e}")
+                bar.update()
                 continue
-            cleaned_value = clean_value(attribute["value"])
-            if attr_id == 'weight':
-                formatted_item["weight"] = int(cleaned_value)
-            elif attr_id == 'width':
-                formatted_item["width"] = int(cleaned_value)
-            elif attr_id == 'height':
-                formatted_item["height"] = int(cleaned_value)
-            elif attr_id == 'depth':
-                formatted_item["depth"] = int(cleaned_value)
-            elif attr_id:
-                formatted_item["attributes"].append({
-                    "complex_id": 0,
-                    "id": attr_id,
-                    "values": [{"value": cleaned_value}]
-                })
-
-        formatted_item["attributes"].append({
-            "complex_id": 0,
-            "id": 9048,
-            "values": [{"value": item.get("name", "")}]
-        })
-        formatted_item["attributes"].append({
-                    "complex_id": 0,
-                    "id": 85,
-                    "values": [{"value": "Pedrollo"}]
-                })
-
-        formatted_items.append(formatted_item)
-
-    return {"items": formatted_items}
-
-
-def upload_to_ozon(products_data):
-    OZON_API_URL = "https://api-seller.ozon.ru/v3/product/import"
-    response = requests.post(OZON_API_URL, headers=HEADERS, json=products_data)
-
-    if response.status_code == 200:
-        logger.info("Товары успешно загружены!")
-    else:
-        logger.error(f"Ошибка загрузки: {response.status_code}")
-        logger.error(response.text)
+            bar.update()
+            if product_info and index:
+                digest = content_hash(product_info)
+                if not index.is_changed(article, digest):
+                    if state:
+                        state.mark_unchanged(article, category)
+                    continue
+                hashes[article] = digest
+            if product_info:
+                if state:
+                    state.mark_scraped(article, category, product_info)
+                await scraped.put((article, product_info, None))
+            elif state:
+                state.mark_failed(article, "не найден на сайте", category)
+
+    async def crawl():
+        await asyncio.gather(feed(), *(fetch() for _ in range(fetchers)))
+        await scraped.put(None)
+
+    async def format_batches():
+        items = []
+        while (entry := await scraped.get()) is not None:
+            article, product_info, item = entry
+            if item is None:
+                try:
+                    item = format_item(product_info)
+                except Exception as e:
+                    logger.error(f"Ошибка форматирования артикула {article}: {e}")
+                    if state:
+                        state.mark_failed(article, str(e))
+                    continue
+                if state:
+                    state.mark_formatted(article, item)
+            items.append(item)
+            if len(items) >= batch_size:
+                await payloads.put({"items": items})
+                items = []
+        if items:
+            await payloads.put({"items": items})
+        for _ in range(uploaders):
+            await payloads.put(None)
+
+    async def upload_batches():
+        while (payload := await payloads.get()) is not None:
+            offer_ids = [item["offer_id"] for item in payload["items"]]
+            # Staged before the upload so a fast confirmation can't precede it
+            if index:
+                index.stage((offer_id, hashes.pop(offer_id)) for offer_id in offer_ids if offer_id in hashes)
+            accepted = await upload(payload) is not None
+            if accepted:
+                logger.info(f"{len(offer_ids)} товаров отгружены")
 
-async def main():
-    ozon_artikuls = await fetch_all_products()
-    artikuls = set(load_artikuls("остатки.XLSX"))
-    data = {"items": []}
-    categories_id = {
-        'А   Дренажные насосы': 91462,
-        'Б   Колодезные насосы': 970731315,
-        'В   Фекальные насосы': 98338,
-        'Г   Скважинные насосы': 970731316,
-        'Д   Самовсасывающие насосы': 91466,
-        'Е   Вихревые насосы': 91471,
-        'Ж   Центробежные': 91466,
-        'З   Многоступенчатые': 91471,
-        'К   Нас. авт.станц': 'del',
-        'Л   Нас. авт.станц. с защ. с/сх': 'del',
-        'М   Баки': 'del',
-        'Н   Аксессуары': 'del',
-        'О   Пульты': 99332,
-        'П   Станции управления': 99332,
-        'Р   Комбипрессы': 'del',
-        'С   Установка SAR': 'del',
-        '*   Гидравлика': 'del',
-        '*   Электродвигатели': 'del',
-        'Артикул': 'del'
-    }
+    try:
+        async with asyncio.TaskGroup() as tg:
+            tg.create_task(crawl())
+            tg.create_task(format_batches())
+            for _ in range(uploaders):
+                tg.create_task(upload_batches())
+    finally:
+        bar.close()
 
-    category = 'del'
-    for article in tqdm(artikuls, desc="Обработка артикулов", unit="товар"):
-        if article in categories_id:
-            category = categories_id[article]
-        elif category == 'del' or article in ozon_artikuls:
-            continue
-        else:
-            product_info = search_product(article, category_id=category)
-            if product_info:
-                data["items"].append(product_info)
-            time.sleep(0.1)
-
-        if len(data["items"]) >= 100:
-            ozon_data = format_for_ozon(data)
-            upload_to_ozon(ozon_data)
-            data = {"items": []}
-            logger.info("100 товаров отгружены")
-
-    if data["items"]:
-        ozon_data = format_for_ozon(data)
-        upload_to_ozon(ozon_data)
+async def main():
+    state = CrawlState()
+    async with OzonClient() as client:
+        await import_new_products(client, state)
+    # Finished cleanly: the next run starts over
+    state.reset()
+    state.close()
+
+async def import_new_products(client, state):
+    ozon_artikuls = state.ozon_offer_ids()
+    if ozon_artikuls is None:
+        ozon_artikuls = await fetch_all_products(client)
+        state.save_ozon_offer_ids(ozon_artikuls)
+    else:
+        logger.info(f"Продолжение прерванного запуска: каталог Ozon из контрольной точки ({len(ozon_artikuls)})")
+    def candidates():
+        seen = set()
+        for category, article in iter_categorized_articles("остатки.XLSX", CATEGORY_IDS):
+            if article in seen or (article in ozon_artikuls and not PARSER_UPDATE_EXISTING):
+                continue
+            seen.add(article)
+            yield article, category
+
+    cache = HttpCache()
+    index = ProductIndex()
+
+    def import_finished(result):
+        index.confirm(result.imported)
+        state.mark_uploaded(result.imported)
+        for offer_id, errors in result.failed.items():
+            state.mark_failed(offer_id, json.dumps(errors, ensure_ascii=False))
+
+    importer = ProductImporter(client, on_result=import_finished)
+    async with Crawler(cache=cache) as crawler:
+        await run_pipeline(crawler, candidates(), importer.upload, state, index)
+    await importer.wait()
+    index.close()
+    cache.close()
 
 
 if __name__ == '__main__':
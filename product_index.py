@@ -0,0 +1,72 @@
+import os
+import json
+import time
+import hashlib
+import sqlite3
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+# Content hashes of supplier products accepted by Ozon
+PRODUCT_INDEX_PATH = os.getenv("PRODUCT_INDEX_PATH", "product_index.sqlite3")
+
+# Scraped fields that make up a card's content
+HASHED_FIELDS = ("name", "price", "description", "images", "attributes")
+
+
+def content_hash(product_info: Dict[str, Any]) -> str:
+    content = {field: product_info.get(field) for field in HASHED_FIELDS}
+    data = json.dumps(content, ensure_ascii=False, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(data.encode("utf-8")).hexdigest()
+
+
+class ProductIndex:
+    """
+    Article -> hash of the scraped card as last imported. A re-crawl compares
+    against it and passes on only cards whose content changed. Hashes of
+    submitted cards are staged and only take effect once Ozon confirms the
+    import, so failed or unconfirmed imports are offered again.
+    """
+
+    def __init__(self, path: str = PRODUCT_INDEX_PATH):
+        self.conn = sqlite3.connect(path)
+        self.conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS products (
+                article      TEXT PRIMARY KEY,
+                hash         TEXT,
+                pending_hash TEXT,
+                updated_at   REAL NOT NULL
+            );
+            """
+        )
+        self.conn.commit()
+
+    def close(self) -> None:
+        self.conn.close()
+
+    def get(self, article: str) -> Optional[str]:
+        row = self.conn.execute("SELECT hash FROM products WHERE article = ?", (article,)).fetchone()
+        return row[0] if row else None
+
+    def is_changed(self, article: str, digest: str) -> bool:
+        return self.get(article) != digest
+
+    def stage(self, hashes: Iterable[Tuple[str, str]]) -> None:
+        """Remember (article, hash) pairs of submitted cards until the import is confirmed."""
+        now = time.time()
+        self.conn.executemany(
+            "INSERT INTO products (article, pending_hash, updated_at) VALUES (?, ?, ?) "
+            "ON CONFLICT (article) DO UPDATE SET pending_hash = excluded.pending_hash, "
+            "updated_at = excluded.updated_at",
+            [(article, digest, now) for article, digest in hashes]
+        )
+        self.conn.commit()
+
+    def confirm(self, articles: Iterable[str]) -> None:
+        """Make the staged hashes of imported cards current."""
+        now = time.time()
+        self.conn.executemany(
+            "UPDATE products SET hash = pending_hash, pending_hash = NULL, updated_at = ? "
+            "WHERE article = ? AND pending_hash IS NOT NULL",
+            [(now, article) for article in articles]
+        )
+        self.conn.commit()
@@ -0,0 +1,175 @@
+import os
+import time
+import asyncio
+import logging
+from typing import Callable, List, Optional
+
+from aiogram import types
+from aiogram.exceptions import TelegramBadRequest, TelegramRetryAfter
+
+# Minimum seconds between edits of the progress message (Telegram rate-limits edits)
+PROGRESS_EDIT_INTERVAL = float(os.getenv("PROGRESS_EDIT_INTERVAL", "3"))
+
+# Minimum seconds between progress log lines
+PROGRESS_LOG_INTERVAL = float(os.getenv("PROGRESS_LOG_INTERVAL", "10"))
+
+STAGE_LABELS = {
+    "catalog": "Загрузка каталога Ozon",
+    "pushing": "Отправка цен и остатков",
+    "done": "Готово",
+    "failed": "Ошибка",
+    "cancelled": "Отменено",
+}
+
+# Stages after which no more events arrive
+FINAL_STAGES = {"done", "failed", "cancelled"}
+
+
+class Progress:
+    """
+    Counters of one update run. Every change is broadcast to the subscribed
+    listeners (Telegram message, log, metrics), which do their own throttling.
+    """
+
+    def __init__(self):
+        self.stage = "catalog"
+        self.catalog_size = 0
+        self.total_items = 0
+        self.done_items = 0
+        self.failed_items = 0
+        self.batches_sent = 0
+        self.batches_ok = 0
+        self.batches_failed = 0
+        self.started_at = time.monotonic()
+        self.push_started_at: Optional[float] = None
+        self._listeners: List[Callable[["Progress"], None]] = []
+
+    def subscribe(self, listener: Callable[["Progress"], None]) -> None:
+        self._listeners.append(listener)
+
+    def _emit(self) -> None:
+        for listener in self._listeners:
+            try:
+                listener(self)
+            except Exception:
+                logging.exception("Progress listener failed")
+
+    # Events
+    def catalog_fetched(self, catalog_size: int) -> None:
+        self.catalog_size = catalog_size
+        self.stage = "pushing"
+        self.push_started_at = time.monotonic()
+        self._emit()
+
+    def planned(self, items: int) -> None:
+        self.total_items += items
+        self._emit()
+
+    def batch_done(self, updated: int, failed: int, retried: int = 0) -> None:
+        """Record one finished request; retried items are still pending."""
+        self.batches_sent += 1
+        if failed or retried:
+            self.batches_failed += 1
+        else:
+            self.batches_ok += 1
+        self.done_items += updated + failed
+        self.failed_items += failed
+        self._emit()
+
+    def finish(self) -> None:
+        self.stage = "done"
+        self._emit()
+
+    def fail(self) -> None:
+        self.stage = "failed"
+        self._emit()
+
+    def cancel(self) -> None:
+        self.stage = "cancelled"
+        self._emit()
+
+    # Derived values
+    @property
+    def rows_per_second(self) -> float:
+        if self.push_started_at is None:
+            return 0.0
+        elapsed = time.monotonic() - self.push_started_at
+        return self.done_items / elapsed if elapsed > 0 else 0.0
+
+    @property
+    def eta(self) -> Optional[float]:
+        rate = self.rows_per_second
+        if not rate:
+            return None
+        return max(0, self.total_items - self.done_items) / rate
+
+    def format(self) -> str:
+        lines = [STAGE_LABELS[self.stage]]
+        if self.catalog_size:
+            lines.append(f"Каталог: {self.catalog_size} товаров")
+        if self.push_started_at is not None:
+            lines.append(
+                f"Пакеты: отправлено {self.batches_sent}, успешно {self.batches_ok}, "
+                f"с ошибками {self.batches_failed}"
+            )
+            lines.append(
+                f"Позиции: {self.done_items} из {self.total_items} "
+                f"({self.rows_per_second:.0f}/с, ошибок {self.failed_items})"
+            )
+            if self.stage == "pushing" and self.eta is not None:
+                lines.append(f"Осталось ~{int(self.eta)} с")
+        return "\n".join(lines)
+
+
+class LogProgress:
+    """Listener that writes progress to the log at most every `interval` seconds."""
+
+    def __init__(self, name: str, interval: float = PROGRESS_LOG_INTERVAL):
+        self.name = name
+        self.interval = interval
+        self._last = 0.0
+
+    def __call__(self, progress: Progress) -> None:
+        now = time.monotonic()
+        if progress.stage not in FINAL_STAGES and now - self._last < self.interval:
+            return
+        self._last = now
+        logging.info(f"[{self.name}] " + progress.format().replace("\n", "; "))
+
+
+class TelegramProgress:
+    """
+    Listener that keeps one Telegram message up to date, editing it at most
+    every `interval` seconds. Call `flush` at the end to show the final state.
+    """
+
+    def __init__(self, message: types.Message, interval: float = PROGRESS_EDIT_INTERVAL):
+        self.message = message
+        self.interval = interval
+        self._last = 0.0
+        self._text: Optional[str] = message.text
+        self._task: Optional[asyncio.Task] = None
+
+    def __call__(self, progress: Progress) -> None:
+        now = time.monotonic()
+        if now - self._last < self.interval or (self._task and not self._task.done()):
+            return
+        self._last = now
+        self._task = asyncio.create_task(self._edit(progress.format()))
+
+    async def flush(self, progress: Progress) -> None:
+        if self._task is not None:
+            await asyncio.gather(self._task, return_exceptions=True)
+        await self._edit(progress.format())
+
+    async def _edit(self, text: str) -> None:
+        if text == self._text:
+            return
+        try:
+            await self.message.edit_text(text)
+            self._text = text
+        except TelegramRetryAfter as e:
+            # Skip this frame; the next one goes out after the flood wait
+            self._last = time.monotonic() + e.retry_after
+        except TelegramBadRequest as e:
+            logging.warning(f"Progress message edit failed: {e}")
@@ -0,0 +1,35 @@
+import time
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Hashable, Tuple
+
+
+class SingleFlight:
+    """
+    Coalesce concurrent calls with the same key into one in-flight task and
+    share its result with later callers for `ttl` seconds.
+    """
+
+    def __init__(self, ttl: float = 0):
+        self.ttl = ttl
+        self._inflight: Dict[Hashable, asyncio.Task] = {}
+        self._results: Dict[Hashable, Tuple[float, Any]] = {}
+
+    async def do(self, key: Hashable, func: Callable[[], Awaitable[Any]]) -> Any:
+        cached = self._results.get(key)
+        if cached is not None and time.monotonic() - cached[0] < self.ttl:
+            return cached[1]
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.create_task(func())
+            self._inflight[key] = task
+            task.add_done_callback(lambda t: self._done(key, t))
+        # One caller being cancelled must not cancel the shared call
+        return await asyncio.shield(task)
+
+    def forget(self, key: Hashable) -> None:
+        self._results.pop(key, None)
+
+    def _done(self, key: Hashable, task: asyncio.Task) -> None:
+        self._inflight.pop(key, None)
+        if not task.cancelled() and task.exception() is None:
+            self._results[key] = (time.monotonic(), task.result())
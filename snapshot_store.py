@@ -0,0 +1,77 @@
+import os
+import time
+import sqlite3
+from typing import Any, Dict, List
+
+import pandas as pd
+
+# Snapshot of the last successfully pushed prices/stocks
+SNAPSHOT_PATH = os.getenv("SNAPSHOT_PATH", "push_snapshot.sqlite3")
+
+# Snapshot columns owned by each update endpoint
+SNAPSHOT_FIELDS = {
+    "prices": ["price", "old_price"],
+    "stocks": ["stock", "warehouse_id"],
+}
+
+
+class PushSnapshot:
+    """
+    Per-account record of the last price, old_price, stock and warehouse that
+    Ozon accepted for each offer_id. Used to send only rows that changed.
+    """
+
+    def __init__(self, account: str, path: str = SNAPSHOT_PATH):
+        self.account = str(account)
+        self.conn = sqlite3.connect(path)
+        self.conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS snapshot (
+                account      TEXT NOT NULL,
+                offer_id     TEXT NOT NULL,
+                price        TEXT,
+                old_price    TEXT,
+                stock        INTEGER,
+                warehouse_id INTEGER,
+                pushed_at    REAL NOT NULL,
+                PRIMARY KEY (account, offer_id)
+            );
+            """
+        )
+        self.conn.commit()
+
+    def close(self) -> None:
+        self.conn.close()
+
+    def load(self) -> pd.DataFrame:
+        return pd.read_sql_query(
+            "SELECT offer_id, price, old_price, stock, warehouse_id FROM snapshot WHERE account = ?",
+            self.conn,
+            params=(self.account,)
+        )
+
+    def changed_rows(self, frame: pd.DataFrame, endpoint: str) -> pd.DataFrame:
+        """Return rows of the update frame whose `endpoint` fields differ from the snapshot."""
+        fields = SNAPSHOT_FIELDS[endpoint]
+        last = self.load()[["offer_id"] + fields]
+        merged = frame.merge(last, on="offer_id", how="left", suffixes=("", "_last"))
+        changed = pd.Series(False, index=merged.index)
+        for field in fields:
+            changed |= merged[field] != merged[f"{field}_last"]
+        return frame[changed.to_numpy()]
+
+    def record(self, endpoint: str, records: List[Dict[str, Any]]) -> None:
+        """Remember records that Ozon accepted for `endpoint`."""
+        fields = SNAPSHOT_FIELDS[endpoint]
+        now = time.time()
+        updates = ", ".join(f"{field} = excluded.{field}" for field in fields)
+        self.conn.executemany(
+            f"INSERT INTO snapshot (account, offer_id, {', '.join(fields)}, pushed_at) "
+            f"VALUES (?, ?, {', '.join('?' for _ in fields)}, ?) "
+            f"ON CONFLICT (account, offer_id) DO UPDATE SET {updates}, pushed_at = excluded.pushed_at",
+            [
+                (self.account, rec["offer_id"], *(rec[field] for field in fields), now)
+                for rec in records
+            ]
+        )
+        self.conn.commit()
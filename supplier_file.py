@@ -0,0 +1,202 @@
+import csv
+import codecs
+import logging
+from typing import Any, BinaryIO, Dict, Hashable, Iterator, List, Optional, Sequence, Tuple, Union
+
+import pandas as pd
+from openpyxl import load_workbook
+
+# Columns of the supplier stock report (e.g. остатки.xlsx) used by the bot and scripts
+SUPPLIER_COLUMNS = ("Группа", "Цена", "СКЛАД")
+
+# How many top rows to scan for the header before giving up
+HEADER_SCAN_ROWS = 30
+
+# CSV ingestion: bytes sniffed for delimiter/encoding and rows per parsed chunk
+CSV_SAMPLE_BYTES = 64 * 1024
+CSV_CHUNK_ROWS = 50_000
+
+Source = Union[str, BinaryIO]
+
+
+def find_header(
+    rows: Iterator[Sequence[Any]],
+    columns: Sequence[str],
+    max_rows: int = HEADER_SCAN_ROWS
+) -> Tuple[int, List[int]]:
+    """
+    Find the first row containing all `columns` and return
+    (row index, column positions in the order of `columns`).
+    Raises KeyError if no such row is found in the first `max_rows` rows.
+    """
+    for index, row in enumerate(rows):
+        if index >= max_rows:
+            break
+        names = [str(value).strip() if value is not None else None for value in row]
+        if all(column in names for column in columns):
+            return index, [names.index(column) for column in columns]
+    raise KeyError(f"В файле отсутствуют столбцы {', '.join(repr(c) for c in columns)}")
+
+
+def iter_supplier_rows(
+    source: Source,
+    columns: Sequence[str] = SUPPLIER_COLUMNS
+) -> Iterator[Tuple[Any, ...]]:
+    """
+    Stream the requested columns of the first sheet row by row using
+    openpyxl's read-only mode. The header row is detected, not hard-coded;
+    fully empty rows are skipped.
+    """
+    wb = load_workbook(source, read_only=True, data_only=True)
+    try:
+        rows = wb.worksheets[0].iter_rows(values_only=True)
+        _, positions = find_header(rows, columns)
+        for row in rows:
+            values = tuple(row[pos] if pos < len(row) else None for pos in positions)
+            if any(value is not None for value in values):
+                yield values
+    finally:
+        wb.close()
+
+
+def read_supplier_excel(
+    source: Source,
+    columns: Sequence[str] = SUPPLIER_COLUMNS,
+    xls: bool = False
+) -> pd.DataFrame:
+    """
+    Read only `columns` from a supplier workbook into a DataFrame.
+    Legacy .xls files are not readable by openpyxl and go through pandas,
+    still with header detection and column projection.
+    """
+    if xls:
+        head = pd.read_excel(source, header=None, nrows=HEADER_SCAN_ROWS)
+        header, _ = find_header(head.itertuples(index=False), columns)
+        if hasattr(source, "seek"):
+            source.seek(0)
+        return pd.read_excel(source, header=header, usecols=list(columns))[list(columns)]
+    df = pd.DataFrame(list(iter_supplier_rows(source, columns)), columns=list(columns))
+    logging.info(f"Supplier file: {len(df)} rows read")
+    return df
+
+
+def load_articles(source: Source, column: str = "Группа") -> List[str]:
+    """Return the non-empty values of the article column as stripped strings."""
+    return [
+        str(value).strip()
+        for (value,) in iter_supplier_rows(source, (column,))
+        if value is not None
+    ]
+
+
+def iter_categorized_articles(
+    source: Source,
+    categories: Dict[str, Any],
+    column: str = "Группа",
+    skip: Hashable = "del"
+) -> Iterator[Tuple[Any, str]]:
+    """
+    Stream (category_id, article) pairs in sheet order. Rows whose value is a
+    key of `categories` are section headers that set the current category;
+    articles under a category mapped to `skip` (or before any header) are
+    left out.
+    """
+    category = skip
+    for article in (str(value).strip() for (value,) in iter_supplier_rows(source, (column,)) if value is not None):
+        if article in categories:
+            category = categories[article]
+        elif category != skip:
+            yield category, article
+
+
+def sniff_csv(sample: bytes) -> Tuple[str, str]:
+    """Guess (encoding, delimiter) of a CSV file from its first bytes."""
+    try:
+        # Incremental decoder tolerates a multi-byte char cut at the sample end
+        text = codecs.getincrementaldecoder("utf-8-sig")().decode(sample, final=False)
+        encoding = "utf-8-sig"
+    except UnicodeDecodeError:
+        text = sample.decode("cp1251", errors="replace")
+        encoding = "cp1251"
+    try:
+        delimiter = csv.Sniffer().sniff(text, delimiters=";,\t|").delimiter
+    except csv.Error:
+        delimiter = ","
+    return encoding, delimiter
+
+
+def iter_supplier_csv(
+    source: Source,
+    columns: Sequence[str] = SUPPLIER_COLUMNS,
+    chunksize: int = CSV_CHUNK_ROWS,
+    encoding: Optional[str] = None,
+    encoding_errors: str = "strict"
+) -> Iterator[pd.DataFrame]:
+    """
+    Parse a CSV export with the C engine in chunks of `chunksize` rows,
+    keeping only `columns`. Encoding (unless given) and delimiter are sniffed
+    once from a small sample. Raises KeyError if a column is missing.
+    """
+    if isinstance(source, str):
+        with open(source, "rb") as f:
+            sample = f.read(CSV_SAMPLE_BYTES)
+    else:
+        sample = source.read(CSV_SAMPLE_BYTES)
+        source.seek(0)
+    sniffed, delimiter = sniff_csv(sample)
+    encoding = encoding or sniffed
+    logging.info(f"CSV sniffed: encoding={encoding}, delimiter={delimiter!r}")
+    try:
+        reader = pd.read_csv(
+            source,
+            sep=delimiter,
+            encoding=encoding,
+            encoding_errors=encoding_errors,
+            usecols=list(columns),
+            chunksize=chunksize,
+            engine="c"
+        )
+    except ValueError as e:
+        # pandas reports missing usecols as ValueError; other parse errors pass through
+        if "Usecols do not match" in str(e):
+            raise KeyError(str(e)) from e
+        raise
+    with reader:
+        for chunk in reader:
+            yield chunk[list(columns)]
+
+
+def read_supplier_csv(
+    source: Source,
+    columns: Sequence[str] = SUPPLIER_COLUMNS,
+    required: Optional[Sequence[str]] = None,
+    chunksize: int = CSV_CHUNK_ROWS
+) -> pd.DataFrame:
+    """
+    Read a CSV export chunk by chunk, dropping rows with empty `required`
+    columns before chunks are concatenated, so memory stays proportional
+    to the kept rows of the three projected columns.
+    """
+    def read(encoding: Optional[str] = None, errors: str = "strict") -> List[pd.DataFrame]:
+        if hasattr(source, "seek"):
+            source.seek(0)
+        return [
+            chunk.dropna(subset=list(required)) if required else chunk
+            for chunk in iter_supplier_csv(source, columns, chunksize, encoding, errors)
+        ]
+
+    try:
+        chunks = read()
+    except UnicodeDecodeError:
+        # The sample decoded but a later chunk did not: retry the whole file as
+        # cp1251, and if that breaks the header, keep the sniffed encoding and
+        # replace the undecodable bytes
+        logging.warning("CSV does not decode past the sniffed sample, retrying as cp1251")
+        try:
+            chunks = read("cp1251")
+        except KeyError:
+            logging.warning("CSV has mixed encodings, undecodable bytes replaced")
+            chunks = read(errors="replace")
+    if not chunks:
+        return pd.DataFrame(columns=list(columns))
+    return pd.concat(chunks, ignore_index=True)
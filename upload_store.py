@@ -0,0 +1,81 @@
+import os
+import hashlib
+import logging
+import tempfile
+from typing import BinaryIO, IO
+
+# Uploads up to this size stay in memory; larger ones spill to a temp file
+UPLOAD_SPOOL_BYTES = int(os.getenv("UPLOAD_SPOOL_BYTES", str(20 * 1024 * 1024)))
+
+# Retained raw uploads
+UPLOAD_STORE_DIR = os.getenv("UPLOAD_STORE_DIR", "user_files")
+UPLOAD_STORE_MAX_FILES = int(os.getenv("UPLOAD_STORE_MAX_FILES", "100"))
+UPLOAD_STORE_MAX_BYTES = int(os.getenv("UPLOAD_STORE_MAX_BYTES", str(500 * 1024 * 1024)))
+
+
+def spooled_buffer(max_size: int = UPLOAD_SPOOL_BYTES) -> IO[bytes]:
+    """Binary buffer kept in memory until it grows past `max_size` bytes."""
+    return tempfile.SpooledTemporaryFile(max_size=max_size)
+
+
+class UploadStore:
+    """
+    Content-addressed store of raw uploads: files are named by their SHA-256,
+    so identical uploads are kept once. The least recently stored files are
+    evicted when the file count or total size exceeds the limits.
+    """
+
+    def __init__(
+        self,
+        root: str = UPLOAD_STORE_DIR,
+        max_files: int = UPLOAD_STORE_MAX_FILES,
+        max_bytes: int = UPLOAD_STORE_MAX_BYTES
+    ):
+        self.root = root
+        self.max_files = max_files
+        self.max_bytes = max_bytes
+        os.makedirs(root, exist_ok=True)
+
+    def put(self, fileobj: BinaryIO, suffix: str = "") -> str:
+        """
+        Store the contents of `fileobj` and return the stored path.
+        The stream is rewound afterwards so it can be parsed right away.
+        """
+        digest = hashlib.sha256()
+        fd, tmp_path = tempfile.mkstemp(dir=self.root, suffix=".part")
+        try:
+            with os.fdopen(fd, "wb") as tmp:
+                for chunk in iter(lambda: fileobj.read(1024 * 1024), b""):
+                    digest.update(chunk)
+                    tmp.write(chunk)
+            path = os.path.join(self.root, digest.hexdigest() + suffix)
+            if os.path.exists(path):
+                os.remove(tmp_path)
+                os.utime(path)
+            else:
+                os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        finally:
+            fileobj.seek(0)
+        self.evict()
+        return path
+
+    def evict(self) -> None:
+        entries = []
+        for name in os.listdir(self.root):
+            if name.endswith(".part"):
+                continue
+            path = os.path.join(self.root, name)
+            if os.path.isfile(path):
+                stat = os.stat(path)
+                entries.append((stat.st_mtime, stat.st_size, path))
+        entries.sort()
+        total = sum(size for _, size, _ in entries)
+        while entries and (len(entries) > self.max_files or total > self.max_bytes):
+            _, size, path = entries.pop(0)
+            os.remove(path)
+            total -= size
+            logging.info(f"Evicted stored upload {path}")